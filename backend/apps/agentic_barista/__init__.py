@@ -1,10 +1,12 @@
 from apps.registry import registry, AppConfig
 from apps.agentic_barista.routes import router
+from apps.agentic_barista.ingest import order_ingest
 
 registry.register(AppConfig(
     name="agentic-barista",
     router=router,
     models_module="apps.agentic_barista.models",
+    shutdown_function=order_ingest.close,
     display_name="Agentic Barista",
     description="LangGraph workflow with multi-agent coffee ordering system",
     icon="☕",
@@ -1,49 +1,60 @@
 from typing import Dict
-from apps.agentic_barista.models import MenuItem, Order
+from apps.agentic_barista.cart import Cart, to_cents
+from apps.agentic_barista.ingest import order_ingest
+from apps.agentic_barista.models import MenuItem
 
 class ConfirmationAgent:
     async def process(self, message: str, state: Dict) -> str:
-        cart = state.get("cart", {})
+        cart: Cart = state["cart"]
         session_id = state.get("session_id", "default")
-        
+
         if not cart:
             return "❌ Your cart is empty! Add items first before confirming."
-        
-        # Calculate total
-        items = await MenuItem.filter(id__in=list(cart.keys())).all()
-        total = 0
-        order_items = []
-        
-        for item in items:
-            quantity = cart[item.id]
-            item_total = float(item.price) * quantity
-            total += item_total
-            order_items.append({
-                "id": item.id,
-                "name": item.name,
-                "quantity": quantity,
-                "price": float(item.price),
-                "total": item_total
-            })
-        
-        # Save order
-        order = await Order.create(
-            session_id=session_id,
-            items=order_items,
-            total=total,
-            status="confirmed"
-        )
-        
+
+        # One bulk query re-checks the prices captured when the items were added
+        rows = await MenuItem.filter(id__in=list(cart.lines)).values_list("id", "price", "available")
+        current = {item_id: (float(price), available) for item_id, price, available in rows}
+        changes = []
+        for line in list(cart.lines.values()):
+            price, available = current.get(line.item_id, (None, False))
+            if not available:
+                cart.remove(line.item_id)
+                changes.append(f"• {line.name} is no longer available and was removed")
+            elif to_cents(price) != line.unit_cents:
+                old_price = line.unit_price
+                cart.reprice(line.item_id, price)
+                changes.append(f"• {line.name}: ${old_price:.2f} → ${price:.2f}")
+
+        if changes:
+            response = "⚠️ **Your cart changed since you added these items:**\n" + "\n".join(changes) + "\n\n"
+            if not cart:
+                return response + "Your cart is now empty. Try 'show menu' to pick something else."
+            return response + f"**New total: ${cart.total:.2f}**\n\nSay 'confirm order' to place it."
+
+        order_items = [
+            {
+                "id": line.item_id,
+                "name": line.name,
+                "quantity": line.quantity,
+                "price": line.unit_price,
+                "total": line.line_total
+            }
+            for line in cart.lines.values()
+        ]
+        total = cart.total
+
+        # Queue the order; the reference is known before the batched insert runs
+        reference = order_ingest.submit(session_id, cart.checkout_id, order_items, total, state.get("user_id"))
+
         # Clear cart
-        state["cart"] = {}
-        state["total_amount"] = 0
-        
+        cart.clear()
+
         # Build response
-        response = f"✅ **Order Confirmed!** (Order #{order.id})\n\n"
+        response = f"✅ **Order Confirmed!** (Order {reference})\n\n"
         response += "**Items:**\n"
         for item_data in order_items:
             response += f"• {item_data['quantity']}x {item_data['name']} - ${item_data['total']:.2f}\n"
         response += f"\n**Total: ${total:.2f}**\n\n"
         response += "Your order will be ready in 10-15 minutes. Thank you! ☕"
-        
+
         return response
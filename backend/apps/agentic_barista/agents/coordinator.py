@@ -1,18 +1,36 @@
-from typing import Literal
+import time
+from typing import AsyncGenerator, Literal, Optional
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
+from apps.agentic_barista.cart import Cart
 from apps.agentic_barista.graph.state import CafeState
 from apps.agentic_barista.agents.menu_agent import MenuAgent
 from apps.agentic_barista.agents.order_agent import OrderAgent
 from apps.agentic_barista.agents.confirmation_agent import ConfirmationAgent
 from langchain_core.messages import HumanMessage, AIMessage
+from apps.agentic_barista.intent import (
+    COMBINED_INSTRUCTIONS, CONFIRM_WORDS, MENU_WORDS, ORDER_WORDS, classify_intent, parse_route_reply, router_stats
+)
+from apps.agentic_barista.menu_cache import menu_cache
+from config import settings
 from services.ai_service import ai_service
 
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+
 class BaristaCoordinator:
-    def __init__(self, model_name: str = "gemini-2.5-flash-lite"):
+    """Multi-agent barista workflow, compiled once and shared by all requests.
+
+    The coordinator and its agents hold no per-conversation state: the
+    model name, cart and session travel in the graph state, so a single
+    instance can serve concurrent messages.
+    """
+    
+    def __init__(self, model_name: str = DEFAULT_MODEL):
         self.menu_agent = MenuAgent()
         self.order_agent = OrderAgent()
         self.confirmation_agent = ConfirmationAgent()
-        self.model_name = model_name
+        self.default_model = model_name
         self.graph = self._build_graph()
     
     def _build_graph(self) -> StateGraph:
@@ -43,9 +61,17 @@ class BaristaCoordinator:
         
         return workflow.compile()
     
-    async def _route_message(self, state: CafeState) -> CafeState:
+    async def _route_message(self, state: CafeState, config: RunnableConfig) -> CafeState:
         last_message = state["messages"][-1].content if state["messages"] else ""
         
+        # Clear-cut messages are routed locally; only ambiguous ones pay for an LLM call
+        decision = classify_intent(last_message, await menu_cache.get())
+        if decision.confidence >= settings.BARISTA_FAST_ROUTE_CONFIDENCE:
+            router_stats.record_fast_path()
+            state["current_agent"] = decision.agent
+            state["reasoning"] = f"Fast path: {decision.reasoning} ({decision.confidence:.2f})"
+            return state
+        
         # Use AI to determine intent
         prompt = f"""You are a barista assistant coordinator. Analyze the user's message and determine the intent.
 
@@ -57,10 +83,19 @@ Classify into ONE of these intents:
 - CONFIRM: User wants to confirm/place/complete their order (e.g., "confirm order", "place order", "checkout")
 - GENERAL: General questions, greetings, chitchat
 
-Respond with ONLY the intent word: MENU, ORDER, CONFIRM, or GENERAL"""
+"""
+        # Combined mode answers GENERAL messages in the same call, saving the general node's round trip.
+        # Streamed turns keep the short intent-only call: the combined reply would hold back routing
+        # until the whole answer is written, while the general node streams it token by token
+        combined = settings.BARISTA_COMBINED_ROUTING and not config.get("configurable", {}).get("stream_tokens")
+        prompt += COMBINED_INSTRUCTIONS if combined else "Respond with ONLY the intent word: MENU, ORDER, CONFIRM, or GENERAL"
 
         try:
-            ai_response = await ai_service.call_model(self.model_name, prompt)
+            started = time.perf_counter()
+            ai_response = await ai_service.call_model(state["model_name"], prompt)
+            router_stats.record_llm(started)
+            if combined:
+                ai_response, state["general_reply"] = parse_route_reply(ai_response)
             ai_response = ai_response.strip().upper()
             
             # Parse response
@@ -80,13 +115,13 @@ Respond with ONLY the intent word: MENU, ORDER, CONFIRM, or GENERAL"""
         except Exception as e:
             # Fallback to keyword matching
             msg_lower = last_message.lower()
-            if any(word in msg_lower for word in ["menu", "show", "what", "have", "available", "items", "drinks", "coffee", "food"]):
+            if any(word in msg_lower for word in MENU_WORDS):
                 state["current_agent"] = "menu"
                 state["reasoning"] = "Keyword match: menu browsing"
-            elif any(word in msg_lower for word in ["confirm", "place", "checkout", "complete", "finish"]):
+            elif any(word in msg_lower for word in CONFIRM_WORDS):
                 state["current_agent"] = "confirmation"
                 state["reasoning"] = "Keyword match: order confirmation"
-            elif any(word in msg_lower for word in ["add", "cart", "remove", "delete", "order"]):
+            elif any(word in msg_lower for word in ORDER_WORDS):
                 state["current_agent"] = "order"
                 state["reasoning"] = "Keyword match: order management"
             else:
@@ -116,9 +151,17 @@ Respond with ONLY the intent word: MENU, ORDER, CONFIRM, or GENERAL"""
         state["messages"].append(AIMessage(content=response))
         return state
     
-    async def _general_node(self, state: CafeState) -> CafeState:
+    async def _general_node(self, state: CafeState, config: RunnableConfig) -> CafeState:
         """Handle general questions conversationally"""
         last_message = state["messages"][-1].content
+        # No-op unless the graph runs under stream_message()
+        write = get_stream_writer()
+        
+        # Already answered by the combined routing call
+        if state.get("general_reply") and state.get("current_agent") == "general":
+            write({"chunk": state["general_reply"]})
+            state["messages"].append(AIMessage(content=state["general_reply"]))
+            return state
         
         prompt = f"""You are a friendly barista assistant. The user asked a general question that doesn't require menu browsing or ordering.
 
@@ -127,36 +170,78 @@ User question: "{last_message}"
 Respond conversationally and helpfully. Keep it brief (2-3 sentences). Be warm and coffee-themed when appropriate.
 If they're asking about coffee in general, share interesting facts. If it's a greeting, be friendly."""
 
-        try:
-            response = await ai_service.call_model(self.model_name, prompt)
-        except:
-            response = "I'm here to help you with our menu and orders! Feel free to ask me anything about coffee or our offerings."
+        fallback = "I'm here to help you with our menu and orders! Feel free to ask me anything about coffee or our offerings."
+        if config.get("configurable", {}).get("stream_tokens"):
+            parts = []
+            try:
+                async for chunk in ai_service.stream_model(state["model_name"], prompt):
+                    parts.append(chunk)
+                    write({"chunk": chunk})
+            except Exception:
+                # Keep whatever already reached the client; otherwise send the fallback
+                if not parts:
+                    parts.append(fallback)
+                    write({"chunk": fallback})
+            response = "".join(parts)
+        else:
+            try:
+                response = await ai_service.call_model(state["model_name"], prompt)
+            except:
+                response = fallback
         
         state["messages"].append(AIMessage(content=response))
         return state
     
-    async def process_message(self, message: str, session_id: str, cart: dict, model_name: str = "gemini-2.5-flash-lite") -> dict:
-        # Update model if different
-        if model_name != self.model_name:
-            self.model_name = model_name
-        
-        initial_state = CafeState(
+    def _initial_state(self, message: str, session_id: str, cart: Cart, model_name: Optional[str], user_id: Optional[int]) -> CafeState:
+        return CafeState(
             messages=[HumanMessage(content=message)],
             session_id=session_id,
+            user_id=user_id,
             cart=cart,
             current_agent="",
-            total_amount=0.0
+            total_amount=cart.total,
+            model_name=model_name or self.default_model
         )
+    
+    async def process_message(self, message: str, session_id: str, cart: Cart, model_name: Optional[str] = None, user_id: Optional[int] = None) -> dict:
+        result = await self.graph.ainvoke(self._initial_state(message, session_id, cart, model_name, user_id))
+        return self._result(result)
+    
+    async def stream_message(self, message: str, session_id: str, cart: Cart, model_name: Optional[str] = None, user_id: Optional[int] = None) -> AsyncGenerator[dict, None]:
+        """Yield {'agent', 'reasoning'} once routed, then {'chunk'} text, then {'result': process_message()-style dict}"""
+        final_state = None
+        streamed = False
+        async for mode, data in self.graph.astream(
+            self._initial_state(message, session_id, cart, model_name, user_id),
+            stream_mode=["updates", "custom", "values"],
+            config={"configurable": {"stream_tokens": True}}
+        ):
+            if mode == "updates" and "router" in data:
+                routed = data["router"]
+                yield {"agent": routed.get("current_agent", "general"), "reasoning": routed.get("reasoning", "")}
+            elif mode == "custom":
+                streamed = True
+                yield data
+            elif mode == "values":
+                final_state = data
         
-        result = await self.graph.ainvoke(initial_state)
-        
+        result = self._result(final_state)
+        # Deterministic agents answer in one piece
+        if not streamed:
+            yield {"chunk": result["response"]}
+        yield {"result": result}
+    
+    def _result(self, result: CafeState) -> dict:
         response_message = result["messages"][-1].content
         reasoning = result.get("reasoning", "")
         
         return {
             "response": response_message,
-            "cart": result.get("cart", {}),
-            "total_amount": result.get("total_amount", 0.0),
+            "cart": result["cart"],
+            "total_amount": result["cart"].total,
             "agent": result.get("current_agent", "unknown"),
             "reasoning": reasoning
         }
+
+# Compiled at import (app startup) and reused for every message
+barista_coordinator = BaristaCoordinator()
@@ -0,0 +1,131 @@
+"""
+Barista cart with line items and a running subtotal.
+
+Each line captures the item's name and unit price from the menu snapshot
+when it is first added, and every add or remove adjusts the subtotal, so
+showing the cart needs no menu lookup or recomputation. Amounts are held
+in integer cents to avoid float drift across many small updates. The
+prices are re-checked against the database once, in bulk, at checkout
+(see ConfirmationAgent). A cart gets a checkout id when its first item
+is added; the order ingest derives the order reference from it, so
+confirming the same cart twice records one order.
+"""
+import json
+import uuid
+from typing import Dict, List, Optional
+
+class CartLine:
+    __slots__ = ("item_id", "name", "unit_cents", "quantity")
+
+    def __init__(self, item_id: int, name: str, unit_cents: int, quantity: int):
+        self.item_id = item_id
+        self.name = name
+        self.unit_cents = unit_cents
+        self.quantity = quantity
+
+    @property
+    def unit_price(self) -> float:
+        return self.unit_cents / 100
+
+    @property
+    def line_total(self) -> float:
+        return self.unit_cents * self.quantity / 100
+
+def to_cents(price: float) -> int:
+    return int(round(price * 100))
+
+class Cart:
+    def __init__(self, lines: Optional[List[CartLine]] = None, checkout_id: Optional[str] = None):
+        self.lines: Dict[int, CartLine] = {line.item_id: line for line in lines or []}
+        self.subtotal_cents = sum(line.unit_cents * line.quantity for line in self.lines.values())
+        self.checkout_id = checkout_id or (uuid.uuid4().hex if self.lines else None)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self.lines
+
+    @property
+    def total(self) -> float:
+        return self.subtotal_cents / 100
+
+    def quantity(self, item_id: int) -> int:
+        line = self.lines.get(item_id)
+        return line.quantity if line else 0
+
+    def add(self, item, quantity: int = 1):
+        """Add a menu entry; an existing line keeps the unit price it was first added at"""
+        if not self.lines:
+            self.checkout_id = uuid.uuid4().hex
+        line = self.lines.get(item.id)
+        if line is None:
+            line = self.lines[item.id] = CartLine(item.id, item.name, to_cents(item.price), 0)
+        line.quantity += quantity
+        self.subtotal_cents += line.unit_cents * quantity
+
+    def remove(self, item_id: int, quantity: Optional[int] = None) -> int:
+        """Take `quantity` off a line (the whole line when None); returns how many were removed"""
+        line = self.lines.get(item_id)
+        if line is None:
+            return 0
+        removed = line.quantity if quantity is None else min(quantity, line.quantity)
+        line.quantity -= removed
+        self.subtotal_cents -= line.unit_cents * removed
+        if line.quantity == 0:
+            del self.lines[item_id]
+        return removed
+
+    def reprice(self, item_id: int, unit_price: float):
+        line = self.lines[item_id]
+        new_cents = to_cents(unit_price)
+        self.subtotal_cents += (new_cents - line.unit_cents) * line.quantity
+        line.unit_cents = new_cents
+
+    def clear(self):
+        self.lines.clear()
+        self.subtotal_cents = 0
+        self.checkout_id = None
+
+    def quantities(self) -> Dict[int, int]:
+        """{item_id: quantity}, the shape API responses have always used"""
+        return {item_id: line.quantity for item_id, line in self.lines.items()}
+
+    def render(self) -> str:
+        response = "🛒 **Your Cart:**\n\n"
+        for line in self.lines.values():
+            response += f"• {line.quantity}x {line.name} - ${line.line_total:.2f}\n"
+        response += f"\n**Total: ${self.total:.2f}**\n\nSay 'confirm order' to complete your purchase!"
+        return response
+
+    def encode(self) -> str:
+        """Compact form for the cart store: {"c": checkout_id, "l": [[item_id, quantity, unit_cents, name], ...]}"""
+        return json.dumps(
+            {
+                "c": self.checkout_id,
+                "l": [[line.item_id, line.quantity, line.unit_cents, line.name] for line in self.lines.values()]
+            },
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+
+    @classmethod
+    def decode(cls, data: Optional[str], menu=None) -> "Cart":
+        """Read any stored cart format; `menu` (a MenuSnapshot) prices carts that predate line items"""
+        if not data:
+            return cls()
+        decoded = json.loads(data)
+        if isinstance(decoded, dict) and "l" not in decoded:
+            # The first cart store kept only {item_id: quantity}; take names and prices from the menu
+            entries = [(menu.get(int(item_id)) if menu else None, quantity) for item_id, quantity in decoded.items()]
+            return cls([
+                CartLine(entry.id, entry.name, to_cents(entry.price), quantity)
+                for entry, quantity in entries
+                if entry is not None and quantity > 0
+            ])
+        # Carts saved before checkout ids were a bare list of lines
+        lines, checkout_id = (decoded, None) if isinstance(decoded, list) else (decoded["l"], decoded["c"])
+        return cls(
+            [CartLine(item_id, name, unit_cents, quantity) for item_id, quantity, unit_cents, name in lines],
+            checkout_id
+        )
@@ -0,0 +1,200 @@
+"""
+Cart storage for barista sessions.
+
+Carts live behind a small CartStore interface with two backends, chosen
+by BARISTA_CART_STORE:
+
+- "memory": an in-process LRU bounded by BARISTA_CART_MAX_SESSIONS and
+  BARISTA_CART_MAX_BYTES, dropping carts idle for BARISTA_CART_IDLE_SECONDS.
+  It is fast, but carts are only visible to the worker that holds them.
+- "database": one barista_carts row per session, shared by every
+  replica and worker.
+
+Both store carts in the compact form of Cart.encode(); carts in the older
+{item_id: quantity} form are priced from the menu as they are read and
+rewritten in the current form on their next change. A chat turn edits its
+cart inside `async with cart_store.open(session_id) as cart:`. Turns of
+the same session run one at a time within a worker. The database
+backend also writes with a version check, so a concurrent turn on
+another replica raises CartConflict instead of silently overwriting.
+A turn that fails leaves the stored cart untouched.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from config import settings
+from apps.agentic_barista.cart import Cart
+from apps.agentic_barista.menu_cache import menu_cache
+from apps.agentic_barista.models import BaristaCart
+
+class CartConflict(Exception):
+    """The cart was changed by another request since it was loaded"""
+
+class CartHandle:
+    __slots__ = ("items",)
+
+    def __init__(self, items: Cart):
+        self.items = items
+
+class _SessionLocks:
+    """One asyncio.Lock per session, dropped once nobody holds or awaits it"""
+
+    def __init__(self):
+        self._locks: Dict[str, list] = {}  # session_id -> [lock, users]
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+class CartStore(ABC):
+    def __init__(self):
+        self._locks = _SessionLocks()
+
+    @abstractmethod
+    async def _load(self, session_id: str) -> Tuple[Cart, object]:
+        """Cart plus an opaque token that _save uses to detect concurrent writes"""
+
+    @abstractmethod
+    async def _save(self, session_id: str, cart: Cart, token: object):
+        """Persist the cart, raising CartConflict if `token` is stale"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Occupancy counters for /cache/stats"""
+
+    async def _decode(self, data: Optional[str]) -> Cart:
+        return Cart.decode(data, await menu_cache.get())
+
+    async def get(self, session_id: str) -> Cart:
+        cart, _ = await self._load(session_id)
+        return cart
+
+    @asynccontextmanager
+    async def open(self, session_id: str):
+        """Load a session's cart for one turn and persist it if the turn succeeds"""
+        async with self._locks.hold(session_id):
+            cart, token = await self._load(session_id)
+            original = cart.encode()
+            handle = CartHandle(cart)
+            yield handle
+            if handle.items.encode() != original:
+                await self._save(session_id, handle.items, token)
+
+class MemoryCartStore(CartStore):
+    def __init__(self, max_sessions: int, max_bytes: int, idle_seconds: int):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._carts: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # session -> (last_access, encoded)
+        self._bytes = 0
+        self.evicted = 0
+
+    async def _load(self, session_id: str) -> Tuple[Cart, object]:
+        entry = self._carts.get(session_id)
+        if entry is None:
+            return Cart(), None
+        now = time.monotonic()
+        if now - entry[0] > self.idle_seconds:
+            self._drop(session_id)
+            return Cart(), None
+        self._carts[session_id] = (now, entry[1])
+        self._carts.move_to_end(session_id)
+        return await self._decode(entry[1]), None
+
+    async def _save(self, session_id: str, cart: Cart, token: object):
+        self._drop(session_id)
+        if cart:
+            encoded = cart.encode()
+            self._carts[session_id] = (time.monotonic(), encoded)
+            self._bytes += len(encoded)
+        self._evict()
+
+    def _drop(self, session_id: str):
+        entry = self._carts.pop(session_id, None)
+        if entry:
+            self._bytes -= len(entry[1])
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._carts:
+            session_id, (last_access, _) = next(iter(self._carts.items()))
+            over_capacity = len(self._carts) > self.max_sessions or self._bytes > self.max_bytes
+            if not over_capacity and now - last_access <= self.idle_seconds:
+                break
+            self._drop(session_id)
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._carts),
+            "bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted
+        }
+
+class DatabaseCartStore(CartStore):
+    PURGE_EVERY_SAVES = 1000
+
+    def __init__(self, idle_seconds: int):
+        super().__init__()
+        self.idle_seconds = idle_seconds
+        self.conflicts = 0
+        self._saves = 0
+
+    async def _load(self, session_id: str) -> Tuple[Cart, object]:
+        row = await BaristaCart.get_or_none(session_id=session_id)
+        if row is None:
+            return Cart(), None
+        return await self._decode(row.items), row.version
+
+    async def _save(self, session_id: str, cart: Cart, token: object):
+        encoded = cart.encode()
+        if token is None:
+            _, created = await BaristaCart.get_or_create(session_id=session_id, defaults={"items": encoded, "version": 1})
+            updated = 1 if created else 0
+        else:
+            # Bulk updates skip auto_now; purge_idle relies on updated_at
+            updated = await BaristaCart.filter(session_id=session_id, version=token).update(
+                items=encoded, version=token + 1, updated_at=datetime.now(timezone.utc)
+            )
+        if not updated:
+            self.conflicts += 1
+            raise CartConflict(session_id)
+
+        self._saves += 1
+        if self._saves % self.PURGE_EVERY_SAVES == 0:
+            await self.purge_idle()
+
+    async def purge_idle(self) -> int:
+        """Delete carts untouched for longer than the idle timeout"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.idle_seconds)
+        return await BaristaCart.filter(updated_at__lt=cutoff).delete()
+
+    def stats(self) -> Dict:
+        return {"backend": "database", "conflicts": self.conflicts, "saves": self._saves}
+
+def create_cart_store() -> CartStore:
+    if settings.BARISTA_CART_STORE == "database":
+        return DatabaseCartStore(idle_seconds=settings.BARISTA_CART_IDLE_SECONDS)
+    return MemoryCartStore(
+        max_sessions=settings.BARISTA_CART_MAX_SESSIONS,
+        max_bytes=settings.BARISTA_CART_MAX_BYTES,
+        idle_seconds=settings.BARISTA_CART_IDLE_SECONDS
+    )
+
+cart_store = create_cart_store()
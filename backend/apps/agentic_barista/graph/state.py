@@ -1,9 +1,13 @@
-from typing import Dict, List, TypedDict
+from typing import Optional
 from langgraph.graph import MessagesState
+from apps.agentic_barista.cart import Cart
 
 class CafeState(MessagesState):
     session_id: str
-    cart: Dict[int, int]  # item_id -> quantity
+    user_id: Optional[int]  # set when the caller is signed in
+    cart: Cart
     current_agent: str
     total_amount: float
+    model_name: str
+    general_reply: str  # set when the combined routing call already answered a GENERAL message
     reasoning: str = ""
@@ -0,0 +1,149 @@
+"""
+Batched, idempotent ingestion of confirmed barista orders.
+
+Confirming an order hands it to the ingest queue and returns its
+reference straight away; the queue writes orders as multi-row inserts,
+flushed when a batch fills or after BARISTA_ORDER_FLUSH_MS. The
+reference is derived from the session and the cart's checkout id, and
+barista_orders.reference is unique, so a retried confirmation of the
+same cart (for example after a cart-store conflict) maps to the same
+row instead of creating a second order. Failed batches are retried a
+few times. An order that still can't be written is logged and kept per
+session; take_lost() hands its reference to the session's next turn so
+the customer is told. On shutdown the worker finishes the batch in
+flight and drains the queue before it stops.
+"""
+import asyncio
+import hashlib
+from typing import Dict, List, Optional
+from config import settings
+from apps.agentic_barista.models import Order
+
+MAX_ATTEMPTS = 3
+
+def order_reference(session_id: str, checkout_id: str) -> str:
+    digest = hashlib.sha256(f"{session_id}:{checkout_id}".encode()).hexdigest()
+    return f"BR-{digest[:10].upper()}"
+
+class OrderIngest:
+    def __init__(self, batch_size: int, flush_interval_ms: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: List[dict] = []
+        self._queued_refs = set()
+        self._lost: Dict[str, List[str]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        self.batches = 0
+        self.rows = 0
+        self.duplicates = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, session_id: str, checkout_id: str, items: List[dict], total: float, user_id: Optional[int] = None) -> str:
+        """Queue a confirmed order and return its reference without waiting for the insert"""
+        reference = order_reference(session_id, checkout_id)
+        if reference in self._queued_refs:
+            self.duplicates += 1
+            return reference
+
+        self._ensure_worker()
+        self._queue.append({
+            "order": Order(
+                session_id=session_id,
+                user_id=user_id,
+                items=items,
+                total=total,
+                status="confirmed",
+                reference=reference
+            ),
+            "attempts": 0
+        })
+        self._queued_refs.add(reference)
+        self._wakeup.set()
+        return reference
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._queue) < self.batch_size and not self._closing:
+                await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            while self._queue:
+                if not await self._flush():
+                    # Back off before retrying a failed batch
+                    await asyncio.sleep(self.flush_interval * 10)
+            if self._closing:
+                return
+
+    async def _flush(self) -> bool:
+        batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+        try:
+            # Rows whose reference already exists are skipped: that checkout was already recorded
+            await Order.bulk_create([entry["order"] for entry in batch], ignore_conflicts=True)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            retry = []
+            for entry in batch:
+                entry["attempts"] += 1
+                if entry["attempts"] < MAX_ATTEMPTS:
+                    retry.append(entry)
+                    continue
+                # The customer was already given this reference; record the loss so their next turn can report it
+                order = entry["order"]
+                self.dropped += 1
+                self._queued_refs.discard(order.reference)
+                self._lost.setdefault(order.session_id, []).append(order.reference)
+                print(f"⚠ Dropped barista order {order.reference} for session {order.session_id} after {MAX_ATTEMPTS} attempts: {e}")
+            self._queue = retry + self._queue
+            return False
+
+        self.batches += 1
+        self.rows += len(batch)
+        for entry in batch:
+            self._queued_refs.discard(entry["order"].reference)
+        return True
+
+    def take_lost(self, session_id: str) -> List[str]:
+        """References of a session's orders that could not be saved since the last call"""
+        return self._lost.pop(session_id, [])
+
+    async def close(self):
+        """Flush everything still queued; called on shutdown"""
+        # Let the worker finish its batch in flight and drain the queue; cancelling it mid-insert would lose that batch
+        self._closing = True
+        try:
+            if self._worker and not self._worker.done():
+                self._wakeup.set()
+                await self._worker
+            while self._queue:
+                if not await self._flush():
+                    await asyncio.sleep(self.flush_interval * 10)
+        finally:
+            self._worker = None
+            self._closing = False
+
+    def stats(self) -> Dict:
+        return {
+            "queued": len(self._queue),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "duplicates": self.duplicates,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "last_error": self.last_error
+        }
+
+order_ingest = OrderIngest(
+    batch_size=settings.BARISTA_ORDER_BATCH_SIZE,
+    flush_interval_ms=settings.BARISTA_ORDER_FLUSH_MS
+)
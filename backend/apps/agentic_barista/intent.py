@@ -0,0 +1,143 @@
+"""
+Deterministic intent classifier for the barista coordinator.
+
+Most barista messages are clear-cut ("show menu", "add 2 lattes",
+"confirm order") and don't need an LLM round trip just to be routed.
+classify_intent scores a message from the keyword lists and from menu
+item mentions found by the snapshot's ItemMatcher, and returns the
+agent with a confidence in [0, 1]. The coordinator trusts decisions at
+or above BARISTA_FAST_ROUTE_CONFIDENCE and sends the rest (questions
+about items, mixed signals, free-form chat) to the LLM router.
+
+A wrong fast-path decision is worse than an LLM call, so only explicit
+requests score high. Checkout takes a confirmation phrase ("confirm my
+order"), not a lone "place" or "complete". An order needs a verb or a
+real count, not just "a latte". Negated messages ("don't add a latte")
+always go to the LLM.
+"""
+import json
+import re
+import time
+from typing import Dict, NamedTuple, Tuple
+from apps.agentic_barista.matcher import tokenize
+
+# Keyword lists, also used by the coordinator when the LLM router fails
+MENU_WORDS = ["menu", "show", "what", "have", "available", "items", "drinks", "coffee", "food"]
+CONFIRM_WORDS = ["confirm", "place", "checkout", "complete", "finish"]
+ORDER_WORDS = ["add", "cart", "remove", "delete", "order"]
+
+GREETING_WORDS = {"hi", "hello", "hey", "thanks", "thank", "cheers", "morning", "bye", "goodbye"}
+QUESTION_WORDS = {"why", "how", "does", "is", "are", "which", "recommend", "should", "difference", "best", "contain", "vegan", "dairy"}
+CART_WORDS = {"cart", "basket", "total"}
+ORDER_VERBS = {"add", "remove", "delete", "want", "like", "get", "have", "take", "grab"}
+BROWSE_WORDS = {"menu", "available", "options", "pastries", "pastry", "drinks", "food", "coffee", "coffees"}
+BROWSE_PHRASES = ["what do you have", "what s available", "what can i get", "what do you sell"]
+FINISH_PHRASES = ["that s all", "that s it"]
+CONFIRM_PHRASES = [
+    "confirm my order", "confirm the order", "confirm order", "confirm it", "place my order",
+    "place the order", "place order", "checkout", "complete my order", "complete the order",
+    "finish my order", "finalize my order", "ready to pay"
+]
+CONFIRM_MESSAGES = {"confirm", "confirm please", "yes confirm"}
+# "t" is what tokenize leaves of n't ("don't", "can't", "won't")
+NEGATION_WORDS = {"not", "no", "don", "dont", "never", "t"}
+SMALL_TALK_WORDS = GREETING_WORDS | {"there", "good", "you", "a", "nice", "day", "very", "much"}
+
+class IntentDecision(NamedTuple):
+    agent: str  # menu, order, confirmation or general
+    confidence: float
+    reasoning: str
+
+def has_phrase(text: str, phrases) -> bool:
+    """Whole-word phrase match on tokenized text"""
+    padded = f" {text} "
+    return any(f" {phrase} " in padded for phrase in phrases)
+
+def classify_intent(message: str, menu) -> IntentDecision:
+    text = " ".join(tokenize(message))
+    words = set(text.split())
+    mentions = menu.matcher.find(message) if words else []
+    question = "?" in message or bool(words & QUESTION_WORDS)
+
+    explicit_confirm = text in CONFIRM_MESSAGES or has_phrase(text, CONFIRM_PHRASES)
+    # "what a nice place", "thanks, that's all": maybe checkout, maybe not
+    confirm = explicit_confirm or bool(words & set(CONFIRM_WORDS)) or has_phrase(text, FINISH_PHRASES)
+    cart_view = bool(words & CART_WORDS)
+    removal = bool(words & {"remove", "delete"})
+    add_verb = bool(words & ORDER_VERBS)
+    explicit_browse = "menu" in words or any(phrase in text for phrase in BROWSE_PHRASES)
+    # A bare category word only counts in short requests like "show coffee"
+    browse = explicit_browse or (bool(words & BROWSE_WORDS) and not add_verb and len(text.split()) <= 4)
+
+    if not words:
+        return IntentDecision("general", 0.9, "empty message")
+    if words & NEGATION_WORDS:
+        # "do not add a latte", "don't confirm yet": the keyword rules can't read these
+        return IntentDecision("general", 0.4, "negated request")
+
+    if explicit_confirm and not mentions and not question:
+        return IntentDecision("confirmation", 0.95, "confirmation phrase")
+    if confirm and not mentions and not question:
+        return IntentDecision("confirmation", 0.6, "confirmation word without a confirmation phrase")
+    if removal and mentions:
+        return IntentDecision("order", 0.95, "removal of a menu item")
+    if cart_view and not mentions and not confirm:
+        return IntentDecision("order", 0.9, "cart request")
+    if mentions and not question and not confirm:
+        # "a"/"an" alone is not a count: "I had a latte yesterday"
+        if add_verb or "please" in words or any(match.counted for match in mentions):
+            return IntentDecision("order", 0.95, "order for a menu item")
+        return IntentDecision("order", 0.7, "menu item mentioned without an order verb or count")
+    if browse and not mentions and not confirm and not cart_view:
+        return IntentDecision("menu", 0.9, "menu browsing keyword")
+    if words & GREETING_WORDS and words <= SMALL_TALK_WORDS:
+        return IntentDecision("general", 0.9, "greeting")
+    return IntentDecision("general", 0.3, "no clear signal")
+
+COMBINED_INSTRUCTIONS = """Respond with ONLY a JSON object: {"intent": "MENU|ORDER|CONFIRM|GENERAL", "reply": "..."}
+When the intent is GENERAL, "reply" is your answer to the user: friendly, brief (2-3 sentences), warm and coffee-themed when appropriate.
+For every other intent, "reply" must be an empty string."""
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+def parse_route_reply(response: str) -> Tuple[str, str]:
+    """(intent, reply) from a combined routing response; tolerates code fences and bare intent words"""
+    match = _JSON_OBJECT.search(response)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+            intent = str(data.get("intent", ""))
+            reply = str(data.get("reply") or "").strip() if intent.strip().upper() == "GENERAL" else ""
+            return intent, reply
+        except (ValueError, AttributeError):
+            pass
+    return response, ""
+
+class RouterStats:
+    """Fast-path hit rate and the LLM routing latency it avoided"""
+
+    def __init__(self):
+        self.fast_path = 0
+        self.llm = 0
+        self.llm_seconds = 0.0
+
+    def record_fast_path(self):
+        self.fast_path += 1
+
+    def record_llm(self, started: float):
+        self.llm += 1
+        self.llm_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict:
+        routed = self.fast_path + self.llm
+        avg_llm = self.llm_seconds / self.llm if self.llm else 0.0
+        return {
+            "routed": routed,
+            "fast_path": self.fast_path,
+            "llm": self.llm,
+            "fast_path_rate": round(self.fast_path / routed, 4) if routed else 0.0,
+            "avg_llm_route_ms": round(avg_llm * 1000, 1),
+            "estimated_ms_saved": round(avg_llm * self.fast_path * 1000, 1)
+        }
+
+router_stats = RouterStats()
@@ -0,0 +1,138 @@
+"""
+Multi-pattern menu item matcher for barista order parsing.
+
+An Aho-Corasick automaton over word tokens holds every item name, its
+plural and any aliases. One left-to-right pass over the message finds
+all mentions, whatever the menu size, and reads the quantity from the
+token just before each mention ("2 lattes", "two croissants",
+"3x mocha", "a bagel"). Working on words rather than characters
+keeps matches on word boundaries, so "tea" never matches inside
+"steam". Overlapping mentions resolve leftmost-longest:
+"chocolate chip cookie" wins over its "cookie" alias.
+
+A matcher is built per MenuSnapshot (see MenuSnapshot.matcher), so it
+is rebuilt whenever the menu version changes.
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "single": 1, "two": 2, "couple": 2, "pair": 2,
+    "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "dozen": 12
+}
+# Read as a quantity of 1, but also just grammar ("I had a latte")
+ARTICLES = {"a", "an"}
+
+# Extra ways customers refer to items, keyed by normalized item name
+ALIASES = {
+    "cappuccino": ["cap", "capp", "cappucino"],
+    "americano": ["black coffee"],
+    "blueberry muffin": ["muffin"],
+    "chocolate chip cookie": ["cookie", "choc chip cookie"],
+    "avocado toast": ["avo toast"],
+    "bagel with cream cheese": ["bagel", "cream cheese bagel"]
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_COUNT = re.compile(r"^(\d+)x?$")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+def pluralize(word: str) -> str:
+    if word.endswith(("s", "x", "z", "ch", "sh")):
+        return word + "es"
+    if word.endswith("y") and len(word) > 1 and word[-2] not in "aeiou":
+        return word[:-1] + "ies"
+    return word + "s"
+
+def name_variants(name: str, aliases: Iterable[str] = ()) -> List[Tuple[str, ...]]:
+    """Token sequences that refer to an item: name and aliases, singular and plural"""
+    variants = []
+    for phrase in [name, *aliases]:
+        words = tokenize(phrase)
+        if not words:
+            continue
+        variants.append(tuple(words))
+        variants.append(tuple(words[:-1]) + (pluralize(words[-1]),))
+    return variants
+
+def parse_quantity(token: str) -> Optional[int]:
+    match = _COUNT.match(token)
+    if match:
+        return int(match.group(1))
+    return NUMBER_WORDS.get(token)
+
+class ItemMatch(NamedTuple):
+    item: object
+    quantity: Optional[int]  # None when the message gives no explicit count
+    counted: bool = False  # quantity came from a number or count word, not just "a"/"an"
+
+class ItemMatcher:
+    def __init__(self, items: Iterable, aliases: Dict[str, List[str]] = ALIASES):
+        # Trie over word tokens: per-state transitions, failure links, and
+        # the (length, item) outputs that end at each state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+
+        for item in items:
+            key = " ".join(tokenize(item.name))
+            for words in name_variants(item.name, aliases.get(key, ())):
+                self._add(words, item)
+        self._link()
+
+    def _add(self, words: Tuple[str, ...], item):
+        state = 0
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        # First registration wins, so names shadow clashing aliases of other items
+        if not self._out[state]:
+            self._out[state].append((len(words), item))
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(word, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[ItemMatch]:
+        """All item mentions in order of appearance, with explicit quantities"""
+        tokens = tokenize(text)
+        hits = []  # (start, length, item)
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length, item in self._out[state]:
+                hits.append((index - length + 1, length, item))
+
+        # Leftmost-longest, non-overlapping
+        hits.sort(key=lambda hit: (hit[0], -hit[1]))
+        matches = []
+        next_free = 0
+        for start, length, item in hits:
+            if start < next_free:
+                continue
+            before = tokens[start - 1] if start > 0 else None
+            quantity = parse_quantity(before) if before else None
+            matches.append(ItemMatch(item, quantity, quantity is not None and before not in ARTICLES))
+            next_free = start + length
+        return matches
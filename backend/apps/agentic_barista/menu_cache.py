@@ -0,0 +1,142 @@
+"""
+Process-wide, versioned snapshot of the barista menu.
+
+The menu changes perhaps once a day, yet every barista turn used to
+re-read it. Agents and routes read an immutable MenuSnapshot instead:
+items by id, by category and by normalized name, plus pre-rendered
+markdown per category. The snapshot is rebuilt when a MenuItem is saved
+or deleted in this process, and otherwise at most every
+BARISTA_MENU_TTL_SECONDS so edits made by other replicas (or by
+seed_menu) show up without a restart. Each rebuild bumps `version`,
+which derived structures use to know when to rebuild themselves.
+"""
+import asyncio
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional
+from tortoise.signals import post_delete, post_save
+from config import settings
+from apps.agentic_barista.models import MenuItem
+from apps.agentic_barista.matcher import ItemMatcher
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"\s+", " ", name.strip().lower())
+
+class MenuEntry(NamedTuple):
+    id: int
+    name: str
+    description: str
+    price: float
+    category: str
+    available: bool
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "price": self.price,
+            "category": self.category
+        }
+
+class MenuSnapshot:
+    def __init__(self, version: int, entries: List[MenuEntry]):
+        self.version = version
+        # Unavailable items stay resolvable by id for carts that already hold them
+        self.by_id: Dict[int, MenuEntry] = {entry.id: entry for entry in entries}
+        self.available: List[MenuEntry] = [entry for entry in entries if entry.available]
+        self.by_category: Dict[str, List[MenuEntry]] = {}
+        self.by_name: Dict[str, MenuEntry] = {}
+        for entry in self.available:
+            self.by_category.setdefault(entry.category, []).append(entry)
+            self.by_name[normalize_name(entry.name)] = entry
+
+        self.category_markdown: Dict[str, str] = {
+            category: "".join(
+                f"• **{entry.name}** - ${entry.price:.2f}\n  {entry.description}\n\n" for entry in items
+            )
+            for category, items in self.by_category.items()
+        }
+        self.full_markdown = "".join(
+            f"**{category.upper()}:**\n"
+            + "".join(f"• {entry.name} - ${entry.price:.2f}\n" for entry in items)
+            + "\n"
+            for category, items in self.by_category.items()
+        )
+
+        self._matcher: Optional[ItemMatcher] = None
+
+    @property
+    def matcher(self) -> ItemMatcher:
+        """Item-name matcher over the available items, built on first use"""
+        if self._matcher is None:
+            self._matcher = ItemMatcher(self.available)
+        return self._matcher
+
+    def get(self, item_id: int) -> Optional[MenuEntry]:
+        return self.by_id.get(item_id)
+
+    def find(self, name: str) -> Optional[MenuEntry]:
+        return self.by_name.get(normalize_name(name))
+
+class MenuCache:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._loaded_at = 0.0
+        self._stale = True
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.reloads = 0
+
+    def _fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and not self._stale
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    async def get(self) -> MenuSnapshot:
+        """Current snapshot; at most one concurrent caller reloads it"""
+        if self._fresh():
+            self.hits += 1
+            return self._snapshot
+        async with self._lock:
+            if not self._fresh():
+                # Cleared before the query so a change landing mid-reload triggers another one
+                self._stale = False
+                items = await MenuItem.all().order_by("id")
+                self._version += 1
+                self._snapshot = MenuSnapshot(self._version, [
+                    MenuEntry(item.id, item.name, item.description, float(item.price), item.category, item.available)
+                    for item in items
+                ])
+                self._loaded_at = time.monotonic()
+                self.reloads += 1
+            else:
+                self.hits += 1
+        return self._snapshot
+
+    def invalidate(self):
+        """Change notification: the next reader rebuilds the snapshot"""
+        self._stale = True
+
+    def stats(self) -> Dict:
+        return {
+            "version": self._version,
+            "items": len(self._snapshot.by_id) if self._snapshot else 0,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "reloads": self.reloads
+        }
+
+menu_cache = MenuCache(ttl_seconds=settings.BARISTA_MENU_TTL_SECONDS)
+
+@post_save(MenuItem)
+async def _menu_item_saved(sender, instance, created, using_db, update_fields):
+    menu_cache.invalidate()
+
+@post_delete(MenuItem)
+async def _menu_item_deleted(sender, instance, using_db):
+    menu_cache.invalidate()
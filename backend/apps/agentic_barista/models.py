@@ -1,4 +1,5 @@
 from tortoise import fields
+from tortoise.models import Model
 from models.base import BaseModel
 
 class MenuItem(BaseModel):
@@ -17,6 +18,19 @@ class Order(BaseModel):
     items = fields.JSONField()
     total = fields.DecimalField(max_digits=10, decimal_places=2)
     status = fields.CharField(max_length=50, default="confirmed")
+    # Derived from the session and cart checkout id (see ingest.py); unique so a checkout is recorded once
+    reference = fields.CharField(max_length=32, unique=True, null=True)
 
     class Meta:
         table = "barista_orders"
+        indexes = (("session_id", "created_at"), ("user_id", "created_at"))
+
+class BaristaCart(Model):
+    """Shared cart storage for the database cart store (see cart_store.py)"""
+    session_id = fields.CharField(max_length=255, pk=True)
+    items = fields.TextField()  # Cart.encode()
+    version = fields.IntField(default=1)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "barista_carts"
@@ -0,0 +1,48 @@
+"""
+Replayable barista turn streams.
+
+A streamed turn runs as its own task and records its SSE frames, so a
+request retried with the same Idempotency-Key replays the frames from
+the start and then follows the turn live, instead of running the graph
+(and changing the cart) a second time. A dropped connection no longer
+cancels the turn halfway through a cart update.
+"""
+import asyncio
+from typing import AsyncGenerator, AsyncIterator, List, Set
+
+# Strong references so a turn whose client went away still runs to the end
+_running: Set[asyncio.Task] = set()
+
+class RecordedStream:
+    def __init__(self, source: AsyncIterator[str]):
+        self.frames: List[str] = []
+        self.finished = False
+        self._changed = asyncio.Event()
+        task = asyncio.create_task(self._record(source))
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _record(self, source: AsyncIterator[str]):
+        try:
+            async for frame in source:
+                self.frames.append(frame)
+                self._notify()
+        finally:
+            self.finished = True
+            self._notify()
+
+    async def replay(self) -> AsyncGenerator[str, None]:
+        """Every frame so far, then the rest as they are produced"""
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.frames):
+                yield self.frames[sent]
+                sent += 1
+            if self.finished:
+                return
+            await changed.wait()
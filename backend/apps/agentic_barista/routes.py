@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict
-from apps.agentic_barista.agents.coordinator import BaristaCoordinator
-from apps.agentic_barista.models import MenuItem, Order
+import json
+from typing import Optional
+from apps.agentic_barista.agents.coordinator import barista_coordinator
+from apps.agentic_barista.models import Order
+from apps.agentic_barista.menu_cache import menu_cache
+from apps.agentic_barista.cart_store import CartConflict, cart_store
+from apps.agentic_barista.intent import router_stats
+from apps.agentic_barista.ingest import order_ingest
+from apps.agentic_barista.replay import RecordedStream
+from services.idempotency import fingerprint, idempotency_store
+from services.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from schemas.responses import cursor_paginated_response
+from auth.models import User
+from auth.utils import get_current_user, get_optional_user
 
 router = APIRouter()
 
-# In-memory cart storage (session_id -> cart)
-cart_storage: Dict[str, Dict[int, int]] = {}
-
 class ChatRequest(BaseModel):
     message: str
     session_id: str
@@ -18,66 +27,158 @@ class MenuResponse(BaseModel):
     items: list
 
 @router.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    # A retried message with the same key returns the first answer instead of re-running the graph
+    return await idempotency_store.run(
+        "agentic-barista/chat",
+        request.session_id,
+        idempotency_key,
+        lambda: process_chat(request, current_user),
+        fingerprint(request)
+    )
+
+def lost_orders_warning(session_id: str) -> Optional[str]:
+    """Tell the customer about confirmed orders from this session that could not be saved"""
+    references = order_ingest.take_lost(session_id)
+    if not references:
+        return None
+    return f"Order {', '.join(references)} could not be saved. Please confirm it again or ask a barista."
+
+async def process_chat(request: ChatRequest, current_user: Optional[User] = None) -> dict:
+    warning = lost_orders_warning(request.session_id)
     try:
-        coordinator = BaristaCoordinator(model_name=request.model)
-        
-        # Get or initialize cart
-        if request.session_id not in cart_storage:
-            cart_storage[request.session_id] = {}
-        
-        cart = cart_storage[request.session_id]
-        
-        # Process message
-        result = await coordinator.process_message(
-            request.message,
-            request.session_id,
-            cart,
-            request.model
-        )
-        
-        # Update cart storage
-        cart_storage[request.session_id] = result["cart"]
-        
-        return {
-            "response": result["response"],
-            "cart": result["cart"],
-            "total_amount": result["total_amount"],
-            "agent": result["agent"],
-            "reasoning": result.get("reasoning", ""),
-            "session_id": request.session_id
-        }
+        # The turn works on a copy; the store only keeps it if the turn succeeds
+        async with cart_store.open(request.session_id) as cart:
+            result = await barista_coordinator.process_message(
+                request.message,
+                request.session_id,
+                cart.items,
+                request.model,
+                current_user.id if current_user else None
+            )
+            cart.items = result["cart"]
+    except CartConflict:
+        raise HTTPException(status_code=409, detail="Cart was updated by another request, please retry")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    response = {
+        "response": result["response"],
+        "cart": result["cart"].quantities(),
+        "total_amount": result["total_amount"],
+        "agent": result["agent"],
+        "reasoning": result.get("reasoning", ""),
+        "session_id": request.session_id
+    }
+    if warning:
+        response["warning"] = warning
+    return response
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """Same turn as /chat as server-sent events: the routed agent and reasoning,
+    then the reply as 'chunk' events, then the saved cart, then 'done'"""
+    async def generate():
+        session_id = request.session_id
+        warning = lost_orders_warning(session_id)
+        if warning:
+            yield sse_event({"warning": warning, "session_id": session_id})
+        try:
+            async with cart_store.open(session_id) as cart:
+                async for event in barista_coordinator.stream_message(
+                    request.message,
+                    session_id,
+                    cart.items,
+                    request.model,
+                    current_user.id if current_user else None
+                ):
+                    if "result" in event:
+                        result = event["result"]
+                        cart.items = result["cart"]
+                    else:
+                        yield sse_event({**event, "session_id": session_id})
+            
+            # Sent only once the cart is stored, so the client never shows an unsaved cart
+            yield sse_event({"cart": result["cart"].quantities(), "total_amount": result["total_amount"], "session_id": session_id})
+            yield sse_event({"done": True, "agent": result["agent"], "session_id": session_id})
+        except CartConflict:
+            yield sse_event({"error": "Cart was updated by another request, please retry", "session_id": session_id})
+        except Exception as e:
+            yield sse_event({"error": str(e), "session_id": session_id})
+    
+    async def start_turn() -> RecordedStream:
+        return RecordedStream(generate())
+    
+    # A retried message with the same key replays the first turn's events instead of re-running the graph
+    recorded = await idempotency_store.run(
+        "agentic-barista/chat/stream",
+        request.session_id,
+        idempotency_key,
+        start_turn,
+        fingerprint(request)
+    )
+    return StreamingResponse(recorded.replay(), media_type="text/event-stream")
 
 @router.get("/menu")
 async def get_menu():
-    items = await MenuItem.filter(available=True).all()
+    menu = await menu_cache.get()
+    return {"items": [item.to_dict() for item in menu.available], "version": menu.version}
+
+def order_summary(order: Order) -> dict:
     return {
-        "items": [
-            {
-                "id": item.id,
-                "name": item.name,
-                "description": item.description,
-                "price": float(item.price),
-                "category": item.category
-            }
-            for item in items
-        ]
+        "id": order.id,
+        "reference": order.reference,
+        "items": order.items,
+        "total": float(order.total),
+        "status": order.status,
+        "created_at": order.created_at.isoformat()
     }
 
+@router.get("/orders")
+async def get_my_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    """Page through the signed-in user's orders across sessions, newest first"""
+    try:
+        orders, next_cursor = await keyset_page(Order.filter(user_id=current_user.id), cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return cursor_paginated_response([order_summary(order) for order in orders], next_cursor, limit)
+
 @router.get("/orders/{session_id}")
-async def get_orders(session_id: str):
-    orders = await Order.filter(session_id=session_id).all()
-    return {
-        "orders": [
-            {
-                "id": order.id,
-                "items": order.items,
-                "total": float(order.total),
-                "status": order.status,
-                "created_at": order.created_at.isoformat()
-            }
-            for order in orders
-        ]
-    }
+async def get_orders(
+    session_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Page through a session's orders, newest first"""
+    try:
+        orders, next_cursor = await keyset_page(Order.filter(session_id=session_id), cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return cursor_paginated_response([order_summary(order) for order in orders], next_cursor, limit)
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Menu snapshot, cart store occupancy and order ingest queue for this worker"""
+    return {"menu": menu_cache.stats(), "carts": cart_store.stats(), "orders": order_ingest.stats()}
+
+@router.get("/router/stats")
+async def get_router_stats():
+    """How often the rule-based router settled intent without an LLM call, and the time saved"""
+    return router_stats.stats()
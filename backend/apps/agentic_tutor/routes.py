@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from auth.utils import get_current_user
 from auth.models import User
 from .models import Topic, TutorSession, Assessment, Progress, ChatMessage
 from .graph import create_tutor_graph
+from services.idempotency import fingerprint, idempotency_store
 import json
 
 router = APIRouter()
@@ -49,8 +50,22 @@ async def get_messages(session_id: int, current_user: User = Depends(get_current
     return [{"role": m.role, "content": m.content, "agent_type": m.agent_type} for m in messages]
 
 @router.post("/chat")
-async def chat(data: ChatRequest, current_user: User = Depends(get_current_user)):
+async def chat(
+    data: ChatRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user)
+):
     """Chat with tutor"""
+    return await idempotency_store.run(
+        "agentic-tutor/chat",
+        current_user.id,
+        idempotency_key,
+        lambda: run_tutor_turn(data, current_user),
+        fingerprint(data)
+    )
+
+async def run_tutor_turn(data: ChatRequest, current_user: User) -> dict:
+    """One tutor turn: load history, run the graph and persist both messages"""
     # Get or create session
     if data.session_id:
         session = await TutorSession.get(id=data.session_id, user_id=current_user.id)
@@ -1,10 +1,14 @@
 from apps.registry import registry, AppConfig
 from apps.ai_chat.routes import router
+from apps.ai_chat.persistence import message_writer
+from apps.ai_chat.cleanup import session_purger
 
 registry.register(AppConfig(
     name="ai-chat",
     router=router,
     models_module="apps.ai_chat.models",
+    init_function=session_purger.resume_pending,
+    shutdown_function=message_writer.close,
     display_name="AI Chat",
     description="Multi-AI chat with document upload, web search, and code execution",
     icon="💬",
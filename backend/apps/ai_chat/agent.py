@@ -1,9 +1,9 @@
 from typing import AsyncGenerator
 from services.ai_service import ai_service
-from apps.ai_chat.utils import search_web, execute_code
+from apps.ai_chat.utils import search_web, execute_code, execute_code_batch
 import re
 
-async def stream_model(messages: list, model: str, context_messages: list = None, document_context: str = None, web_search_enabled: bool = False, code_execution_enabled: bool = True) -> AsyncGenerator[str, None]:
+async def stream_model(messages: list, model: str, context_messages: list = None, document_context: str = None, web_search_enabled: bool = False, code_execution_enabled: bool = True, conversation_summary: str = None) -> AsyncGenerator[str, None]:
     """Stream AI responses with document, web search, and code execution"""
     full_messages = []
     
@@ -14,6 +14,13 @@ async def stream_model(messages: list, model: str, context_messages: list = None
             "content": f"You have access to the following document(s):\n\n{document_context}\n\nUse this information to answer questions."
         })
     
+    # Add rolling summary of turns older than the context window
+    if conversation_summary:
+        full_messages.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n\n{conversation_summary}"
+        })
+    
     # Add conversation context
     if context_messages:
         for msg in context_messages:
@@ -47,24 +54,26 @@ Available Python functions: print, len, range, str, int, float, list, dict, set,
     # Use AIService for streaming
     combined_prompt = "\n\n".join([m["content"] for m in full_messages])
     
-    full_response = ""
+    response_parts = []
     async for chunk in ai_service.stream_model(model, combined_prompt, full_messages):
-        full_response += chunk
+        response_parts.append(chunk)
         yield chunk
+    full_response = "".join(response_parts)
     
     # Check if response contains Python code and execute it
     if code_execution_enabled and model.startswith("gemini") and "```python" in full_response:
-        code_match = re.search(r'```python\n(.*?)\n```', full_response, re.DOTALL)
-        if code_match:
-            code = code_match.group(1)
-            
+        code_blocks = re.findall(r'```python\n(.*?)\n```', full_response, re.DOTALL)
+        if code_blocks:
             yield "\n\n🔄 *Executing code...*\n\n"
             
-            # Execute the code
-            result = execute_code(code)
-            
-            if result['success']:
-                yield f"**Output:**\n```\n{result['output']}\n```\n\n"
+            # Execute the code, batching multiple blocks into one invocation
+            if len(code_blocks) == 1:
+                results = [execute_code(code_blocks[0])]
             else:
-                yield f"**Error:**\n```\n{result['errors']}\n```\n\n"
-
+                results = execute_code_batch(code_blocks)
+            
+            for result in results:
+                if result['success']:
+                    yield f"**Output:**\n```\n{result['output']}\n```\n\n"
+                else:
+                    yield f"**Error:**\n```\n{result['errors']}\n```\n\n"
@@ -0,0 +1,59 @@
+"""
+Background purge of deleted chat sessions.
+
+Deleting a session only flags it (hidden from every query immediately);
+its messages, documents and uploaded S3 objects are then removed here in
+bounded batches so a large session never holds a request or a long
+lock. Answers still streaming are cancelled and queued message writes
+are awaited first, so nothing is inserted after the rows are gone.
+Sessions still flagged after a restart are picked up again on startup.
+"""
+import asyncio
+from config import settings
+from apps.ai_chat.models import ChatSession
+from apps.ai_chat.persistence import message_writer
+from apps.ai_chat.queries import delete_session_rows_batch
+from apps.ai_chat.resumable import generations
+from apps.ai_chat.utils import delete_s3_prefix
+
+class SessionPurger:
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self._running = {}
+    
+    def schedule(self, session_id: int):
+        if session_id in self._running:
+            return
+        task = asyncio.create_task(self._run(session_id))
+        self._running[session_id] = task
+        task.add_done_callback(lambda _: self._running.pop(session_id, None))
+    
+    async def _run(self, session_id: int):
+        try:
+            await self.purge(session_id)
+        except Exception as e:
+            # Left flagged; retried on next startup
+            print(f"⚠ Purge of chat session {session_id} failed: {e}")
+    
+    async def purge(self, session_id: int):
+        # An answer inserted after the batches below would outlive its session
+        await generations.cancel_session(session_id)
+        await message_writer.wait_for(session_id)
+        
+        for table in ("chat_messages", "chat_documents"):
+            while await delete_session_rows_batch(table, session_id, self.batch_size) >= self.batch_size:
+                # Let request traffic use the pool between batches
+                await asyncio.sleep(0)
+        
+        await asyncio.to_thread(delete_s3_prefix, f"chat-documents/{session_id}/")
+        await ChatSession.filter(id=session_id, is_deleted=True).delete()
+    
+    async def resume_pending(self):
+        """Re-schedule purges interrupted by a restart"""
+        for session_id in await ChatSession.filter(is_deleted=True).values_list("id", flat=True):
+            self.schedule(session_id)
+    
+    def stats(self) -> dict:
+        return {"running": len(self._running)}
+
+session_purger = SessionPurger(batch_size=settings.CHAT_DELETE_BATCH_SIZE)
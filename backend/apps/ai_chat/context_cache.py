@@ -0,0 +1,120 @@
+"""
+In-process ring buffer of recent messages per chat session.
+
+Lets chat_stream assemble conversation context without re-reading the
+last few messages from Postgres on every turn. The cache is written
+through on every message insert and falls back to the database on a
+miss. It is process-local, so another worker may have added turns since
+a session was cached: chat_stream compares last_id() with the session's
+latest message id (returned by begin_turn in the same round trip) and
+rebuilds the entry when they differ. Entries also expire after
+CHAT_CONTEXT_CACHE_IDLE_SECONDS.
+"""
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from config import settings
+
+class _SessionBuffer:
+    __slots__ = ("messages", "complete", "last_access")
+    
+    def __init__(self, messages: List[dict], complete: bool, maxlen: int):
+        self.messages = deque(messages, maxlen=maxlen)
+        # True while the buffer holds the session's entire history
+        self.complete = complete
+        self.last_access = time.monotonic()
+
+class ConversationCache:
+    def __init__(self, max_sessions: int, max_messages: int, idle_seconds: int):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[int, _SessionBuffer]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+    
+    def _touch(self, session_id: int) -> Optional[_SessionBuffer]:
+        buffer = self._sessions.get(session_id)
+        if buffer is None:
+            return None
+        now = time.monotonic()
+        if now - buffer.last_access > self.idle_seconds:
+            del self._sessions[session_id]
+            return None
+        buffer.last_access = now
+        self._sessions.move_to_end(session_id)
+        return buffer
+    
+    def _evict_expired(self):
+        now = time.monotonic()
+        # Oldest entries sit at the front, so stop at the first live one
+        while self._sessions:
+            session_id, buffer = next(iter(self._sessions.items()))
+            if now - buffer.last_access <= self.idle_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+    
+    def recent(self, session_id: int, count: int) -> Optional[List[dict]]:
+        """Last `count` messages of a session, oldest first, or None on a miss"""
+        buffer = self._touch(session_id)
+        if buffer is None or (len(buffer.messages) < count and not buffer.complete):
+            self.misses += 1
+            return None
+        self.hits += 1
+        if count <= 0:
+            return []
+        return list(buffer.messages)[-count:]
+    
+    def last_id(self, session_id: int) -> Optional[int]:
+        """Id of the newest cached message of a session (None when empty or not cached)"""
+        buffer = self._sessions.get(session_id)
+        if buffer is None or not buffer.messages:
+            return None
+        return buffer.messages[-1]["id"]
+    
+    def record_stale(self, session_id: int):
+        """A hit turned out to be out of date; drop the entry so it is rebuilt"""
+        self.stale += 1
+        self.evict(session_id)
+    
+    def load(self, session_id: int, messages: List[dict], complete: bool):
+        """Seed a session from the database (messages oldest first)"""
+        if self.max_sessions <= 0 or self.max_messages <= 0:
+            return
+        self._sessions[session_id] = _SessionBuffer(messages, complete, self.max_messages)
+        self._sessions.move_to_end(session_id)
+        self._evict_expired()
+    
+    def append(self, session_id: int, message: dict):
+        """Write-through for a newly persisted message; ignored if the session is not cached"""
+        buffer = self._touch(session_id)
+        if buffer is None:
+            return
+        if len(buffer.messages) == buffer.messages.maxlen:
+            buffer.complete = False
+        buffer.messages.append(message)
+    
+    def evict(self, session_id: int):
+        self._sessions.pop(session_id, None)
+    
+    def stats(self) -> Dict:
+        self._evict_expired()
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "messages": sum(len(b.messages) for b in self._sessions.values()),
+            "max_messages_per_session": self.max_messages,
+            "idle_seconds": self.idle_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+conversation_cache = ConversationCache(
+    max_sessions=settings.CHAT_CONTEXT_CACHE_SESSIONS,
+    max_messages=settings.CHAT_CONTEXT_CACHE_MESSAGES,
+    idle_seconds=settings.CHAT_CONTEXT_CACHE_IDLE_SECONDS
+)
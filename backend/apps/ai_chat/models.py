@@ -1,12 +1,15 @@
 from tortoise import fields
-from models.base import BaseModel
+from models.base import BaseModel, SoftDeleteMixin
 
-class ChatSession(BaseModel):
+class ChatSession(BaseModel, SoftDeleteMixin):
     user_id = fields.IntField()
     title = fields.CharField(max_length=255, default="New Chat")
+    summary = fields.TextField(null=True)
+    summarized_until_id = fields.IntField(default=0)  # Last message folded into summary
     
     class Meta:
         table = "chat_sessions"
+        indexes = (("user_id", "created_at"),)
 
 class ChatMessage(BaseModel):
     session_id = fields.IntField()
@@ -16,6 +19,7 @@ class ChatMessage(BaseModel):
     
     class Meta:
         table = "chat_messages"
+        indexes = (("session_id", "created_at"),)
 
 class ChatDocument(BaseModel):
     session_id = fields.IntField()
@@ -27,3 +31,4 @@ class ChatDocument(BaseModel):
     
     class Meta:
         table = "chat_documents"
+        indexes = (("session_id", "created_at"),)
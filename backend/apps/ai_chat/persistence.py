@@ -0,0 +1,154 @@
+"""
+Write-behind queue for assistant messages.
+
+Streamed answers are handed to the writer once complete and inserted in
+multi-row batches, flushed when the batch fills up or after a short
+delay. Callers that need a session's history to be durable (the next
+turn of the same session) wait for that session's pending writes.
+
+A failed batch is retried a few times. Messages that still can't be
+written are logged and counted per session; take_lost() hands the count
+to the session's next turn so the client can be told.
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional
+from config import settings
+from apps.ai_chat.queries import insert_messages
+
+MAX_ATTEMPTS = 3
+
+class MessageWriter:
+    def __init__(self, batch_size: int, flush_interval_ms: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: List[dict] = []
+        self._pending: Dict[int, List[asyncio.Future]] = {}
+        self._lost: Dict[int, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+    
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+    
+    def enqueue(self, session_id: int, role: str, content: str, model: str = None, on_saved: Callable[[int], None] = None) -> asyncio.Future:
+        """Queue a message for insertion; the returned future resolves to its id"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        # Failures are logged in _flush; mark them retrieved for unawaited futures
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._queue.append({
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "model": model,
+            "future": future,
+            "on_saved": on_saved,
+            "attempts": 0
+        })
+        self._pending.setdefault(session_id, []).append(future)
+        self._wakeup.set()
+        return future
+    
+    async def wait_for(self, session_id: int):
+        """Wait until every queued message of a session has been written"""
+        futures = self._pending.get(session_id)
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+    
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._queue) < self.batch_size and not self._closing:
+                await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            while self._queue:
+                if not await self._flush():
+                    # Back off before retrying a failed batch
+                    await asyncio.sleep(self.flush_interval * 10)
+            if self._closing:
+                return
+    
+    async def _flush(self) -> bool:
+        batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+        try:
+            ids = await insert_messages(batch)
+            self.batches += 1
+            self.rows += len(ids)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            retry = []
+            for item in batch:
+                item["attempts"] += 1
+                if item["attempts"] < MAX_ATTEMPTS:
+                    retry.append(item)
+                    continue
+                # The client already received this answer; record the loss so the next turn can report it
+                self.dropped += 1
+                self._lost[item["session_id"]] = self._lost.get(item["session_id"], 0) + 1
+                print(f"⚠ Dropped {item['role']} message for chat session {item['session_id']} after {MAX_ATTEMPTS} attempts: {e}")
+                item["future"].set_exception(e)
+                self._forget(item)
+            self._queue = retry + self._queue
+            return False
+        
+        for item, message_id in zip(batch, ids):
+            # A failing callback must not leave the future unsettled or kill the worker
+            if item["on_saved"]:
+                try:
+                    item["on_saved"](message_id)
+                except Exception as e:
+                    print(f"⚠ on_saved callback failed for chat session {item['session_id']}: {e}")
+            item["future"].set_result(message_id)
+            self._forget(item)
+        return True
+    
+    def take_lost(self, session_id: int) -> int:
+        """How many of a session's messages could not be saved since the last call"""
+        return self._lost.pop(session_id, 0)
+    
+    def _forget(self, item: dict):
+        futures = self._pending.get(item["session_id"], [])
+        if item["future"] in futures:
+            futures.remove(item["future"])
+        if not futures:
+            self._pending.pop(item["session_id"], None)
+    
+    async def close(self):
+        """Flush everything still queued; called on shutdown"""
+        # Let the worker finish its batch in flight and drain the queue; cancelling it mid-insert would lose that batch
+        self._closing = True
+        try:
+            if self._worker and not self._worker.done():
+                self._wakeup.set()
+                await self._worker
+            while self._queue:
+                if not await self._flush():
+                    await asyncio.sleep(self.flush_interval * 10)
+        finally:
+            self._worker = None
+            self._closing = False
+    
+    def stats(self) -> Dict:
+        return {
+            "queued": len(self._queue),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "last_error": self.last_error
+        }
+
+message_writer = MessageWriter(
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_interval_ms=settings.CHAT_WRITE_FLUSH_MS
+)
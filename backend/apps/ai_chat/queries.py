@@ -0,0 +1,169 @@
+"""
+Raw SQL queries for AI Chat that the ORM cannot express in a single round trip
+"""
+import json
+from typing import List, Optional, Tuple
+from tortoise import Tortoise
+from services.pagination import decode_cursor, encode_cursor
+
+SNIPPET_LENGTH = 120
+
+SESSION_SUMMARY_SQL = """
+SELECT s.id, s.title, s.created_at,
+       lm.snippet AS last_message,
+       lm.role AS last_message_role,
+       COALESCE(lm.created_at, s.created_at) AS last_activity,
+       mc.message_count,
+       dc.document_count
+FROM chat_sessions s
+LEFT JOIN LATERAL (
+    SELECT LEFT(m.content, $5) AS snippet, m.role, m.created_at
+    FROM chat_messages m
+    WHERE m.session_id = s.id
+    ORDER BY m.created_at DESC, m.id DESC
+    LIMIT 1
+) lm ON TRUE
+CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS message_count FROM chat_messages m WHERE m.session_id = s.id
+) mc
+CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS document_count FROM chat_documents d WHERE d.session_id = s.id
+) dc
+WHERE s.user_id = $1 AND NOT s.is_deleted
+  AND ($2::timestamptz IS NULL OR (s.created_at, s.id) < ($2::timestamptz, $3::int))
+ORDER BY s.created_at DESC, s.id DESC
+LIMIT $4
+"""
+
+async def fetch_session_summaries(user_id: int, cursor: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """One page of sessions with last-message preview and counts, in a single query"""
+    created_at, last_id = decode_cursor(cursor) if cursor else (None, None)
+    
+    conn = Tortoise.get_connection("default")
+    rows = await conn.execute_query_dict(
+        SESSION_SUMMARY_SQL,
+        [user_id, created_at, last_id, limit + 1, SNIPPET_LENGTH]
+    )
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
+    
+    items = [{
+        "id": r["id"],
+        "title": r["title"],
+        "created_at": r["created_at"],
+        "last_message": r["last_message"],
+        "last_message_role": r["last_message_role"],
+        "last_activity": r["last_activity"],
+        "message_count": r["message_count"],
+        "document_count": r["document_count"]
+    } for r in rows]
+    return items, next_cursor
+
+DOCUMENT_CONTEXT_CHARS = 5000
+
+# Ownership check, user message insert, context window and document
+# context in one statement. The context subquery reads the snapshot taken
+# before the insert, so it never includes the message being sent.
+BEGIN_TURN_SQL = """
+WITH s AS (
+    SELECT id, summary, summarized_until_id
+    FROM chat_sessions
+    WHERE id = $1 AND user_id = $2 AND NOT is_deleted
+), ins AS (
+    INSERT INTO chat_messages (session_id, role, content, created_at, updated_at)
+    SELECT s.id, 'user', $3, CLOCK_TIMESTAMP(), CLOCK_TIMESTAMP() FROM s
+    RETURNING id
+)
+SELECT s.id, s.summary, s.summarized_until_id,
+       (SELECT id FROM ins) AS message_id,
+       (SELECT m.id FROM chat_messages m
+        WHERE m.session_id = s.id
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT 1) AS last_message_id,
+       -- Unsummarized messages, counted only up to $6 so it stays an index range scan
+       (SELECT COUNT(*) FROM (
+            SELECT m.id FROM chat_messages m
+            WHERE m.session_id = s.id
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT $6
+       ) u WHERE u.id > s.summarized_until_id) AS unsummarized_count,
+       (SELECT COALESCE(json_agg(c ORDER BY c.created_at, c.id), '[]'::json) FROM (
+            SELECT m.id, m.role, m.content, m.created_at
+            FROM chat_messages m
+            WHERE m.session_id = s.id
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT $4
+       ) c) AS context,
+       (SELECT COALESCE(json_agg(json_build_object('filename', d.filename, 'text', LEFT(d.extracted_text, $5)) ORDER BY d.id), '[]'::json)
+        FROM chat_documents d
+        WHERE d.session_id = s.id) AS documents
+FROM s
+"""
+
+INSERT_MESSAGES_SQL = """
+INSERT INTO chat_messages (session_id, role, content, model, created_at, updated_at)
+SELECT t.session_id, t.role, t.content, t.model, CLOCK_TIMESTAMP(), CLOCK_TIMESTAMP()
+FROM unnest($1::int[], $2::text[], $3::text[], $4::text[]) WITH ORDINALITY AS t(session_id, role, content, model, ord)
+ORDER BY t.ord
+RETURNING id
+"""
+
+async def begin_turn(session_id: int, user_id: int, message: str, context_limit: int, count_limit: int) -> Optional[dict]:
+    """Persist the user message and load everything a turn needs in one round trip.
+
+    unsummarized_count excludes the message being sent and is capped at
+    count_limit. Returns None when the session does not exist or belongs
+    to another user.
+    """
+    conn = Tortoise.get_connection("default")
+    rows = await conn.execute_query_dict(
+        BEGIN_TURN_SQL,
+        [session_id, user_id, message, context_limit, DOCUMENT_CONTEXT_CHARS, count_limit]
+    )
+    if not rows:
+        return None
+    
+    row = rows[0]
+    context = json.loads(row["context"]) if isinstance(row["context"], str) else row["context"]
+    documents = json.loads(row["documents"]) if isinstance(row["documents"], str) else row["documents"]
+    return {
+        "session_id": row["id"],
+        "summary": row["summary"],
+        "summarized_until_id": row["summarized_until_id"],
+        "message_id": row["message_id"],
+        # Latest message before this turn, used to validate the context cache
+        "last_message_id": row["last_message_id"],
+        "unsummarized_count": row["unsummarized_count"],
+        "context": [{"id": m["id"], "role": m["role"], "content": m["content"]} for m in context],
+        "documents": documents
+    }
+
+async def insert_messages(messages: List[dict]) -> List[int]:
+    """Insert several messages with one multi-row statement, returning ids in input order"""
+    conn = Tortoise.get_connection("default")
+    rows = await conn.execute_query_dict(
+        INSERT_MESSAGES_SQL,
+        [
+            [m["session_id"] for m in messages],
+            [m["role"] for m in messages],
+            [m["content"] for m in messages],
+            [m.get("model") for m in messages]
+        ]
+    )
+    return [r["id"] for r in rows]
+
+PURGEABLE_TABLES = {"chat_messages", "chat_documents"}
+
+async def delete_session_rows_batch(table: str, session_id: int, limit: int) -> int:
+    """Delete up to `limit` rows of a session from a child table, returning the number deleted"""
+    if table not in PURGEABLE_TABLES:
+        raise ValueError(f"Unsupported table: {table}")
+    
+    conn = Tortoise.get_connection("default")
+    rows_affected, _ = await conn.execute_query(
+        f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE session_id = $1 LIMIT $2)",
+        [session_id, limit]
+    )
+    return rows_affected
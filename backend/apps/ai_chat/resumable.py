@@ -0,0 +1,148 @@
+"""
+Resumable chat generations.
+
+A generation runs as its own task and publishes numbered SSE events
+into a bounded ring buffer instead of writing straight to the HTTP
+response. Any number of subscribers can follow it, and a client whose
+connection dropped reconnects with Last-Event-ID to replay what it
+missed and continue live. A generation with no subscribers keeps
+running for SSE_RESUME_GRACE_SECONDS before it is cancelled, and a
+finished one stays replayable for the same period.
+
+Generations live in the memory of the worker that started them, so a
+resume must reach that same worker. With several processes or replicas
+this needs sticky routing; elsewhere the stream id is unknown (404).
+"""
+import asyncio
+import itertools
+import uuid
+from collections import deque
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Optional
+from config import settings
+from apps.ai_chat.streaming import sse_event
+
+class Generation:
+    def __init__(self, registry: "GenerationRegistry", session_id: int, user_id: int, buffer_size: int):
+        self.id = uuid.uuid4().hex
+        self.registry = registry
+        self.session_id = session_id
+        self.user_id = user_id
+        self.events = deque(maxlen=buffer_size)  # (seq, frame)
+        self.last_seq = 0
+        self.finished = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+    
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+    
+    def publish(self, frame: str):
+        """Append an encoded `data: ...` frame and wake subscribers"""
+        self.last_seq += 1
+        self.events.append((self.last_seq, frame))
+        self._notify()
+    
+    def finish(self):
+        self.finished = True
+        self._notify()
+    
+    def can_resume_from(self, last_event_id: int) -> bool:
+        """True if every event after `last_event_id` is still buffered"""
+        first_seq = self.events[0][0] if self.events else self.last_seq + 1
+        return first_seq <= last_event_id + 1 <= self.last_seq + 1
+    
+    async def subscribe(self, last_event_id: int = 0) -> AsyncGenerator[str, None]:
+        """Replay buffered events after `last_event_id`, then follow the generation live"""
+        cursor = last_event_id
+        self.subscribers += 1
+        try:
+            while True:
+                changed = self._changed
+                if not self.can_resume_from(cursor):
+                    # Fell further behind than the buffer holds
+                    yield sse_event({'error': 'Stream buffer overrun, please reload', 'session_id': self.session_id})
+                    return
+                
+                first_seq = self.events[0][0] if self.events else cursor + 1
+                for seq, frame in itertools.islice(self.events, cursor + 1 - first_seq, None):
+                    yield f"id: {seq}\n{frame}"
+                    cursor = seq
+                
+                if self.finished and cursor >= self.last_seq:
+                    return
+                if cursor >= self.last_seq:
+                    await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0:
+                self.registry.on_detached(self)
+
+class GenerationRegistry:
+    def __init__(self, buffer_size: int, grace_seconds: int):
+        self.buffer_size = buffer_size
+        self.grace_seconds = grace_seconds
+        self._generations: Dict[str, Generation] = {}
+    
+    def start(self, session_id: int, user_id: int, produce: Callable[[Generation], Awaitable[None]]) -> Generation:
+        """Run `produce(generation)` in the background and register the generation"""
+        generation = Generation(self, session_id, user_id, self.buffer_size)
+        self._generations[generation.id] = generation
+        
+        async def run():
+            try:
+                await produce(generation)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                generation.publish(sse_event({'error': str(e), 'session_id': session_id}))
+            finally:
+                generation.finish()
+                self._expire_later(generation)
+        
+        generation.task = asyncio.create_task(run())
+        return generation
+    
+    def get(self, generation_id: str, user_id: int) -> Optional[Generation]:
+        generation = self._generations.get(generation_id)
+        if generation is None or generation.user_id != user_id:
+            return None
+        return generation
+    
+    async def cancel_session(self, session_id: int):
+        """Stop a session's unfinished generations and wait until they have wound down"""
+        tasks = [
+            g.task for g in self._generations.values()
+            if g.session_id == session_id and not g.finished and g.task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def on_detached(self, generation: Generation):
+        self._expire_later(generation)
+    
+    def _expire_later(self, generation: Generation):
+        asyncio.get_running_loop().call_later(self.grace_seconds, self._expire, generation)
+    
+    def _expire(self, generation: Generation):
+        if generation.subscribers > 0:
+            return
+        if not generation.finished:
+            # Nobody came back within the grace period
+            generation.task.cancel()
+        elif self._generations.get(generation.id) is generation:
+            del self._generations[generation.id]
+    
+    def stats(self) -> Dict:
+        return {
+            "active": sum(1 for g in self._generations.values() if not g.finished),
+            "retained": len(self._generations),
+            "subscribers": sum(g.subscribers for g in self._generations.values())
+        }
+
+generations = GenerationRegistry(
+    buffer_size=settings.SSE_RESUME_BUFFER_EVENTS,
+    grace_seconds=settings.SSE_RESUME_GRACE_SECONDS
+)
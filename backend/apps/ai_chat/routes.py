@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Header
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from auth.utils import get_current_user
@@ -6,14 +6,29 @@ from auth.models import User
 from apps.ai_chat.models import ChatSession, ChatMessage, ChatDocument
 from apps.ai_chat.agent import stream_model
 from apps.ai_chat.utils import extract_text_from_file, upload_to_s3
-import json
+from apps.ai_chat.queries import fetch_session_summaries, begin_turn, insert_messages
+from apps.ai_chat.persistence import message_writer
+from apps.ai_chat.context_cache import conversation_cache
+from apps.ai_chat.summarizer import summarizer
+from apps.ai_chat.streaming import ChunkFrameEncoder, coalesce_chunks, sse_event
+from apps.ai_chat.resumable import generations, Generation
+from apps.ai_chat.cleanup import session_purger
+from config import settings
+from services.idempotency import fingerprint, idempotency_store
+from services.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from schemas.responses import cursor_paginated_response
+from datetime import datetime, timezone
+import asyncio
 
 router = APIRouter()
 
+MAX_COMPARE_MODELS = 4
+
 class ChatRequest(BaseModel):
     session_id: int | None = None
     message: str
     model: str = "gemini"
+    models: list[str] = []  # Compare mode: stream every listed model side by side
     context_size: int = 10
     web_search: bool = False
 
@@ -26,28 +41,66 @@ async def create_session(data: SessionCreate, current_user: User = Depends(get_c
     return {"id": session.id, "title": session.title, "created_at": session.created_at}
 
 @router.get("/sessions")
-async def get_sessions(current_user: User = Depends(get_current_user)):
-    sessions = await ChatSession.filter(user_id=current_user.id).order_by("-created_at")
-    return [{"id": s.id, "title": s.title, "created_at": s.created_at} for s in sessions]
+async def get_sessions(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    """Page through sessions, newest first"""
+    try:
+        sessions, next_cursor = await keyset_page(ChatSession.filter(user_id=current_user.id, is_deleted=False), cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    items = [{"id": s.id, "title": s.title, "created_at": s.created_at} for s in sessions]
+    return cursor_paginated_response(items, next_cursor, limit)
+
+@router.get("/sessions/summary")
+async def get_session_summaries(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    """Page of sessions with last message preview, last activity and message/document counts"""
+    try:
+        items, next_cursor = await fetch_session_summaries(current_user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return cursor_paginated_response(items, next_cursor, limit)
 
 @router.get("/sessions/{session_id}/messages")
-async def get_messages(session_id: int, current_user: User = Depends(get_current_user)):
-    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id)
+async def get_messages(
+    session_id: int,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    """Page backwards through history: each page holds older messages, in chronological order"""
+    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id, is_deleted=False)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    messages = await ChatMessage.filter(session_id=session_id).order_by("created_at")
-    return [{"role": m.role, "content": m.content, "model": m.model, "created_at": m.created_at} for m in messages]
+    try:
+        messages, next_cursor = await keyset_page(ChatMessage.filter(session_id=session_id), cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    items = [{"role": m.role, "content": m.content, "model": m.model, "created_at": m.created_at} for m in reversed(messages)]
+    return cursor_paginated_response(items, next_cursor, limit)
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(session_id: int, current_user: User = Depends(get_current_user)):
-    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id)
-    if not session:
+    # Hide the session now; messages, documents and S3 objects are purged in the background
+    hidden = await ChatSession.filter(id=session_id, user_id=current_user.id, is_deleted=False).update(
+        is_deleted=True,
+        deleted_at=datetime.now(timezone.utc)
+    )
+    if not hidden:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    await ChatMessage.filter(session_id=session_id).delete()
-    await ChatDocument.filter(session_id=session_id).delete()
-    await session.delete()
+    conversation_cache.evict(session_id)
+    session_purger.schedule(session_id)
     return {"message": "Session deleted"}
 
 @router.post("/upload")
@@ -56,7 +109,7 @@ async def upload_document(
     session_id: int = Form(...),
     current_user: User = Depends(get_current_user)
 ):
-    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id)
+    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id, is_deleted=False)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -88,7 +141,7 @@ async def upload_document(
 
 @router.get("/sessions/{session_id}/documents")
 async def get_documents(session_id: int, current_user: User = Depends(get_current_user)):
-    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id)
+    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id, is_deleted=False)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -107,7 +160,7 @@ async def delete_document(document_id: int, current_user: User = Depends(get_cur
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    session = await ChatSession.get_or_none(id=document.session_id, user_id=current_user.id)
+    session = await ChatSession.get_or_none(id=document.session_id, user_id=current_user.id, is_deleted=False)
     if not session:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
@@ -120,13 +173,11 @@ async def chat(data: ChatRequest, current_user: User = Depends(get_current_user)
         session = await ChatSession.create(user_id=current_user.id)
         session_id = session.id
     else:
-        session = await ChatSession.get_or_none(id=data.session_id, user_id=current_user.id)
+        session = await ChatSession.get_or_none(id=data.session_id, user_id=current_user.id, is_deleted=False)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         session_id = data.session_id
     
-    await ChatMessage.create(session_id=session_id, role="user", content=data.message)
-    
     # Non-streaming endpoint - deprecated, use /chat/stream instead
     # result = await chat_graph.ainvoke({
     #     "messages": [{"role": "user", "content": data.message}],
@@ -135,57 +186,160 @@ async def chat(data: ChatRequest, current_user: User = Depends(get_current_user)
     # response_text = result["response"]
     
     response_text = "Please use /chat/stream endpoint for responses"
-    await ChatMessage.create(session_id=session_id, role="assistant", content=response_text, model=data.model)
+    await message_writer.wait_for(session_id)
+    user_message_id, assistant_message_id = await insert_messages([
+        {"session_id": session_id, "role": "user", "content": data.message},
+        {"session_id": session_id, "role": "assistant", "content": response_text, "model": data.model}
+    ])
+    conversation_cache.append(session_id, {"id": user_message_id, "role": "user", "content": data.message})
+    conversation_cache.append(session_id, {"id": assistant_message_id, "role": "assistant", "content": response_text})
     
     return {"session_id": session_id, "response": response_text}
 
 @router.post("/chat/stream")
-async def chat_stream(data: ChatRequest, current_user: User = Depends(get_current_user)):
-    if not data.session_id:
-        session = await ChatSession.create(user_id=current_user.id)
-        session_id = session.id
-    else:
-        session = await ChatSession.get_or_none(id=data.session_id, user_id=current_user.id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        session_id = data.session_id
+async def chat_stream(
+    data: ChatRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user)
+):
+    compare_models = list(dict.fromkeys(data.models))
+    if len(compare_models) > MAX_COMPARE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Compare mode supports at most {MAX_COMPARE_MODELS} models")
     
-    await ChatMessage.create(session_id=session_id, role="user", content=data.message)
-    
-    # Get context messages
-    all_messages = await ChatMessage.filter(session_id=session_id).order_by("-created_at").limit(data.context_size * 2)
-    context_messages = [{"role": m.role, "content": m.content} for m in reversed(list(all_messages))]
-    
-    # Get document context
-    documents = await ChatDocument.filter(session_id=session_id).all()
-    document_context = ""
-    if documents:
-        document_context = "\n\n---\n\n".join([
-            f"Document: {d.filename}\n{d.extracted_text[:5000]}"  # First 5k chars per doc
-            for d in documents
-        ])
-    
-    async def generate():
-        full_response = ""
-        async for chunk in stream_model(
-            [{"role": "user", "content": data.message}],
-            data.model,
-            context_messages[:-1],  # Exclude the user message we just added
-            document_context,
-            data.web_search
-        ):
-            full_response += chunk
-            yield f"data: {json.dumps({'chunk': chunk, 'session_id': session_id})}\n\n"
+    async def start_generation() -> Generation:
+        if not data.session_id:
+            session = await ChatSession.create(user_id=current_user.id)
+            session_id = session.id
+            conversation_cache.load(session_id, [], complete=True)
+        else:
+            session_id = data.session_id
+            # The previous answer may still be in the write-behind queue
+            await message_writer.wait_for(session_id)
+        lost_messages = message_writer.take_lost(session_id)
+        
+        # Previous turns, excluding the message being sent
+        context_count = data.context_size * 2 - 1
+        context_messages = conversation_cache.recent(session_id, context_count)
+        cached_last_id = conversation_cache.last_id(session_id)
+        fetch_limit = max(context_count, conversation_cache.max_messages)
+        context_limit = 0 if context_messages is not None else fetch_limit
+        
+        # Ownership check, user message insert, context and documents in one round trip
+        turn = await begin_turn(session_id, current_user.id, data.message, context_limit, summarizer.threshold)
+        if turn is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        context_rows = turn["context"] if context_messages is None else None
+        if context_messages is not None and cached_last_id != turn["last_message_id"]:
+            # Another worker added messages since this one cached the session
+            conversation_cache.record_stale(session_id)
+            context_rows = list(reversed(await ChatMessage.filter(session_id=session_id)
+                .exclude(id=turn["message_id"])
+                .order_by("-created_at", "-id")
+                .limit(fetch_limit)
+                .values("id", "role", "content")))
+        
+        if context_rows is not None:
+            if fetch_limit == conversation_cache.max_messages:
+                conversation_cache.load(session_id, context_rows, complete=len(context_rows) < fetch_limit)
+            context_messages = context_rows[-context_count:] if context_count > 0 else []
+        conversation_cache.append(session_id, {"id": turn["message_id"], "role": "user", "content": data.message})
+        
+        if turn["summary"]:
+            # Older turns are covered by the rolling summary
+            context_messages = [m for m in context_messages if m["id"] > turn["summarized_until_id"]]
+        
+        # Get document context
+        document_context = ""
+        if turn["documents"]:
+            document_context = "\n\n---\n\n".join([
+                f"Document: {d['filename']}\n{d['text']}"  # First 5k chars per doc
+                for d in turn["documents"]
+            ])
+        
+        async def stream_answer(generation: Generation, model: str, tagged: bool):
+            encoder = ChunkFrameEncoder(session_id, model if tagged else None)
+            parts = []
+            chunks = stream_model(
+                [{"role": "user", "content": data.message}],
+                model,
+                context_messages,
+                document_context,
+                data.web_search,
+                conversation_summary=turn["summary"]
+            )
+            async for chunk in coalesce_chunks(chunks, settings.SSE_FLUSH_INTERVAL_MS / 1000, settings.SSE_FLUSH_BYTES):
+                parts.append(chunk)
+                generation.publish(encoder.encode(chunk))
+            full_response = "".join(parts)
+            
+            # Save complete response through the write-behind queue
+            def on_saved(message_id: int):
+                conversation_cache.append(session_id, {"id": message_id, "role": "assistant", "content": full_response})
+                # Messages before this turn, plus the user message and this answer
+                summarizer.schedule(session_id, turn["unsummarized_count"] + 2)
+            
+            message_writer.enqueue(session_id, "assistant", full_response, model, on_saved)
         
-        # Save complete response
-        await ChatMessage.create(session_id=session_id, role="assistant", content=full_response, model=data.model)
-        yield f"data: {json.dumps({'done': True, 'session_id': session_id})}\n\n"
+        async def compare_answer(generation: Generation, model: str):
+            try:
+                await stream_answer(generation, model, tagged=True)
+                generation.publish(sse_event({'model_done': model, 'session_id': session_id}))
+            except Exception as e:
+                generation.publish(sse_event({'error': str(e), 'model': model, 'session_id': session_id}))
+        
+        async def produce(generation: Generation):
+            generation.publish(sse_event({'stream_id': generation.id, 'session_id': session_id}))
+            if lost_messages:
+                generation.publish(sse_event({
+                    'warning': f'{lost_messages} earlier message(s) in this chat could not be saved',
+                    'session_id': session_id
+                }))
+            if len(compare_models) > 1:
+                # Context was assembled once above; every model streams concurrently
+                await asyncio.gather(*(compare_answer(generation, model) for model in compare_models))
+            else:
+                await stream_answer(generation, compare_models[0] if compare_models else data.model, tagged=False)
+            generation.publish(sse_event({'done': True, 'session_id': session_id}))
+        
+        # The generation outlives this connection so a dropped client can resume it
+        return generations.start(session_id, current_user.id, produce)
+    
+    # A retried request with the same Idempotency-Key re-attaches to the first generation
+    generation = await idempotency_store.run(
+        "ai-chat/chat/stream", current_user.id, idempotency_key, start_generation, fingerprint(data)
+    )
+    if generations.get(generation.id, current_user.id) is not generation or not generation.can_resume_from(0):
+        raise HTTPException(status_code=409, detail="This request was already processed; reload the session history")
+    
+    return StreamingResponse(
+        generation.subscribe(),
+        media_type="text/event-stream",
+        headers={"X-Stream-Id": generation.id}
+    )
+
+@router.get("/chat/stream/{stream_id}")
+async def resume_chat_stream(
+    stream_id: str,
+    last_event_id: int = Header(0, alias="Last-Event-ID"),
+    current_user: User = Depends(get_current_user)
+):
+    """Reattach to a running (or recently finished) generation after a dropped connection"""
+    generation = generations.get(stream_id, current_user.id)
+    if not generation:
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+    if not generation.can_resume_from(last_event_id):
+        raise HTTPException(status_code=410, detail="Stream events no longer buffered")
     
-    return StreamingResponse(generate(), media_type="text/event-stream")
+    return StreamingResponse(
+        generation.subscribe(last_event_id),
+        media_type="text/event-stream",
+        headers={"X-Stream-Id": generation.id}
+    )
 
 @router.get("/sessions/{session_id}/context")
 async def get_context_info(session_id: int, context_size: int = 10, current_user: User = Depends(get_current_user)):
-    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id)
+    session = await ChatSession.get_or_none(id=session_id, user_id=current_user.id, is_deleted=False)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -197,3 +351,12 @@ async def get_context_info(session_id: int, context_size: int = 10, current_user
         "context_messages": context_messages,
         "context_size": context_size
     }
+
+@router.get("/cache/stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """Occupancy of this worker's context cache, message write queue and resumable streams"""
+    return {
+        **conversation_cache.stats(),
+        "message_writer": message_writer.stats(),
+        "generations": generations.stats()
+    }
@@ -0,0 +1,79 @@
+"""
+Server-sent event framing for chat streams.
+
+Providers such as Groq emit many tiny chunks per second. Encoding and
+writing one frame per chunk costs a json.dumps call and a socket write
+each, so chunks are coalesced: the first chunk is sent immediately to
+keep time-to-first-token low, after which text is buffered and flushed
+once the buffer reaches a byte threshold or the time window elapses.
+"""
+import asyncio
+import json
+from json.encoder import encode_basestring_ascii
+from typing import AsyncGenerator, AsyncIterator
+
+class ChunkFrameEncoder:
+    """Encodes {'chunk': ..., ['model': ...,] 'session_id': ...} frames with a pre-encoded envelope"""
+    
+    def __init__(self, session_id: int, model: str = None):
+        self.prefix = 'data: {"chunk": '
+        tag = f', "model": {json.dumps(model)}' if model else ''
+        self.suffix = f'{tag}, "session_id": {json.dumps(session_id)}}}\n\n'
+    
+    def encode(self, chunk: str) -> str:
+        # Byte-for-byte identical to json.dumps of the same dict
+        return self.prefix + encode_basestring_ascii(chunk) + self.suffix
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def coalesce_chunks(chunks: AsyncIterator[str], flush_interval: float, max_bytes: int) -> AsyncGenerator[str, None]:
+    """Re-chunk a text stream so each yielded piece spans up to `flush_interval` seconds or `max_bytes`"""
+    buffer = []
+    state = {"bytes": 0, "done": False, "error": None}
+    has_data = asyncio.Event()
+    flush_now = asyncio.Event()
+    
+    async def pump():
+        # Per-chunk work stays at a list append; all framing happens on flush
+        first = True
+        try:
+            async for chunk in chunks:
+                buffer.append(chunk)
+                state["bytes"] += len(chunk)
+                has_data.set()
+                if first or state["bytes"] >= max_bytes:
+                    first = False
+                    flush_now.set()
+        except Exception as e:
+            state["error"] = e
+        finally:
+            state["done"] = True
+            has_data.set()
+            flush_now.set()
+    
+    producer = asyncio.create_task(pump())
+    try:
+        while True:
+            await has_data.wait()
+            if not flush_now.is_set():
+                try:
+                    await asyncio.wait_for(flush_now.wait(), timeout=flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            
+            has_data.clear()
+            flush_now.clear()
+            if buffer:
+                text = "".join(buffer)
+                buffer.clear()
+                state["bytes"] = 0
+                yield text
+            
+            if state["done"] and not buffer:
+                break
+        
+        if state["error"]:
+            raise state["error"]
+    finally:
+        producer.cancel()
@@ -0,0 +1,101 @@
+"""
+Rolling conversation summary per chat session.
+
+Once a session has accumulated enough unsummarized messages, the older
+ones are folded into ChatSession.summary by a background task, leaving
+only the recent window verbatim. stream_model then sends the summary
+plus that window, so prompt size stays roughly constant however long
+the session runs. A session with a long unsummarized backlog (for
+example one that predates summaries) is folded in chunks of
+CHAT_SUMMARY_FOLD_CHUNK messages, at most CHAT_SUMMARY_MAX_FOLD_PER_RUN
+per run, so no single prompt grows with the session's length.
+"""
+import asyncio
+from config import settings
+from services.ai_service import ai_service
+from apps.ai_chat.models import ChatSession, ChatMessage
+
+SUMMARY_MAX_WORDS = 250
+# Longer messages are clipped in the transcript sent for folding
+SUMMARY_MESSAGE_CHARS = 2000
+
+class ConversationSummarizer:
+    def __init__(self, every_turns: int, recent_messages: int, model_name: str, fold_chunk: int, max_fold_per_run: int):
+        self.every_turns = every_turns
+        self.recent_messages = recent_messages
+        self.model_name = model_name
+        self.fold_chunk = fold_chunk
+        self.max_fold_per_run = max_fold_per_run
+        # One summary at a time so background work never competes with live streams
+        self._slot = asyncio.Semaphore(1)
+        self._pending = set()
+        self._tasks = set()
+    
+    @property
+    def threshold(self) -> int:
+        """Unsummarized messages needed before a fold runs"""
+        return self.recent_messages + self.every_turns * 2
+    
+    def schedule(self, session_id: int, unsummarized: int):
+        """Queue a summary refresh once enough messages are unsummarized, unless one is already queued"""
+        if self.every_turns <= 0 or unsummarized < self.threshold or session_id in self._pending:
+            return
+        self._pending.add(session_id)
+        task = asyncio.create_task(self._run(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, session_id: int):
+        try:
+            async with self._slot:
+                await self.update(session_id)
+        except Exception as e:
+            print(f"⚠ Summary for session {session_id} failed: {e}")
+        finally:
+            self._pending.discard(session_id)
+    
+    async def update(self, session_id: int):
+        session = await ChatSession.get_or_none(id=session_id, is_deleted=False)
+        if not session:
+            return
+        
+        summary, summarized_until_id = session.summary, session.summarized_until_id
+        folded = 0
+        while folded < self.max_fold_per_run:
+            chunk = min(self.fold_chunk, self.max_fold_per_run - folded)
+            messages = await ChatMessage.filter(
+                session_id=session_id, id__gt=summarized_until_id
+            ).order_by("id").limit(chunk + self.recent_messages)
+            to_fold = messages[:-self.recent_messages] if self.recent_messages else messages
+            if not to_fold:
+                break
+            
+            summary = await self._fold(summary, to_fold)
+            summarized_until_id = to_fold[-1].id
+            await ChatSession.filter(id=session_id).update(summary=summary, summarized_until_id=summarized_until_id)
+            folded += len(to_fold)
+            if len(messages) < chunk + self.recent_messages:
+                break
+    
+    async def _fold(self, summary: str, messages) -> str:
+        transcript = "\n".join(f"{m.role}: {m.content[:SUMMARY_MESSAGE_CHARS]}" for m in messages)
+        
+        prompt = f"""You maintain a running summary of a conversation between a user and an AI assistant.
+
+Current summary:
+{summary or "(none yet)"}
+
+New messages to fold in:
+{transcript}
+
+Write the updated summary in at most {SUMMARY_MAX_WORDS} words. Keep facts, decisions, user preferences, names, numbers and open questions; drop pleasantries. Respond with the summary only."""
+        
+        return (await ai_service.generate_response(prompt, self.model_name)).strip()
+
+summarizer = ConversationSummarizer(
+    every_turns=settings.CHAT_SUMMARY_EVERY_TURNS,
+    recent_messages=settings.CHAT_SUMMARY_RECENT_MESSAGES,
+    model_name=settings.CHAT_SUMMARY_MODEL,
+    fold_chunk=settings.CHAT_SUMMARY_FOLD_CHUNK,
+    max_fold_per_run=settings.CHAT_SUMMARY_MAX_FOLD_PER_RUN
+)
@@ -51,6 +51,20 @@ def upload_to_s3(file_content: bytes, filename: str, session_id: int) -> str:
     )
     return f"s3://{settings.S3_BUCKET_NAME}/{key}"
 
+def delete_s3_prefix(prefix: str) -> int:
+    """Delete every object under a prefix, 1000 keys per request; returns the count deleted"""
+    if not settings.S3_BUCKET_NAME:
+        return 0
+    
+    deleted = 0
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME, Prefix=prefix):
+        keys = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+        if keys:
+            s3_client.delete_objects(Bucket=settings.S3_BUCKET_NAME, Delete={'Objects': keys, 'Quiet': True})
+            deleted += len(keys)
+    return deleted
+
 def search_web(query: str, max_results: int = 3) -> dict:
     """Search web using Tavily API"""
     if not tavily_client:
@@ -100,3 +114,40 @@ def execute_code(code: str, timeout: int = 30) -> dict:
             'output': '',
             'errors': f"Lambda execution failed: {str(e)}"
         }
+
+def execute_code_batch(snippets: list, timeout: int = 30) -> list:
+    """Execute several Python snippets in a single Lambda invocation"""
+    lambda_client = boto3.client('lambda', region_name=settings.AWS_REGION)
+    
+    try:
+        response = lambda_client.invoke(
+            FunctionName='co-intelligence-code-executor',
+            InvocationType='RequestResponse',
+            Payload=json.dumps({
+                'snippets': snippets,
+                'timeout': timeout
+            })
+        )
+        
+        result = json.loads(response['Payload'].read())
+        body = json.loads(result.get('body', '{}'))
+        if 'results' not in body:
+            raise ValueError(body.get('error', 'No results returned'))
+        
+        return [
+            {
+                'success': r.get('success', False),
+                'output': r.get('output', ''),
+                'errors': r.get('errors'),
+            }
+            for r in body['results']
+        ]
+    except Exception as e:
+        return [
+            {
+                'success': False,
+                'output': '',
+                'errors': f"Lambda execution failed: {str(e)}"
+            }
+            for _ in snippets
+        ]
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header
 from typing import List
 from pydantic import BaseModel
 from auth.models import User
 from models.app_role import AppRole
-from middleware.auth import get_current_user, require_app_role
+from auth.principal import Principal
+from middleware.auth import get_current_user, get_principal, require_app_role
 from .models import Policy, Claim, ClaimDocument, ClaimNote, ClaimStatus
 from .schemas import (
     PolicyCreate, PolicyResponse, ClaimCreate, ClaimUpdate, ClaimResponse,
@@ -11,33 +12,37 @@ from .schemas import (
 )
 from .workflow import can_transition_status
 from services.ai_service import AIService
+from services.idempotency import fingerprint, idempotency_store
 import uuid
 import os
 
 router = APIRouter()
 
+APP_NAME = "insurance-claims"
+
 class RewriteRequest(BaseModel):
     text: str
     model: str = "gemini"
 
 # Auto-assign customer role on first access
-async def ensure_customer_role(user: User):
+async def ensure_customer_role(principal: Principal) -> List[str]:
     """Auto-assign customer role if user has no roles in insurance-claims"""
-    existing_roles = await AppRole.filter(user_id=user.id, app_name="insurance-claims")
-    if not existing_roles:
-        await AppRole.create(user_id=user.id, app_name="insurance-claims", role="customer")
+    user_roles = principal.roles_for(APP_NAME)
+    if not user_roles:
+        await AppRole.get_or_create(user_id=principal.user.id, app_name=APP_NAME, role="customer")
+        principal.with_role(APP_NAME, "customer")
+        user_roles = ["customer"]
+    return user_roles
 
 @router.get("/access")
-async def check_access(current_user: User = Depends(get_current_user)):
+async def check_access(principal: Principal = Depends(get_principal)):
     """Check if user has access to insurance claims app"""
-    await ensure_customer_role(current_user)
-    app_roles = await AppRole.filter(user_id=current_user.id, app_name="insurance-claims")
-    return {"roles": [ar.role for ar in app_roles]}
+    return {"roles": await ensure_customer_role(principal)}
 
 @router.post("/policies", response_model=PolicyResponse)
 async def create_policy(
     policy: PolicyCreate,
-    current_user: User = Depends(require_app_role("insurance-claims", ["customer", "agent", "admin"]))
+    current_user: User = Depends(require_app_role(APP_NAME, ["customer", "agent", "admin"]))
 ):
     policy_number = f"POL-{uuid.uuid4().hex[:8].upper()}"
     new_policy = await Policy.create(
@@ -48,8 +53,9 @@ async def create_policy(
     return PolicyResponse(**new_policy.__dict__)
 
 @router.get("/policies", response_model=List[PolicyResponse])
-async def get_policies(current_user: User = Depends(get_current_user)):
-    await ensure_customer_role(current_user)
+async def get_policies(principal: Principal = Depends(get_principal)):
+    await ensure_customer_role(principal)
+    current_user = principal.user
     
     if current_user.global_role == "admin":
         policies = await Policy.all()
@@ -61,7 +67,7 @@ async def get_policies(current_user: User = Depends(get_current_user)):
 @router.post("/claims", response_model=ClaimResponse)
 async def create_claim(
     claim: ClaimCreate,
-    current_user: User = Depends(require_app_role("insurance-claims", ["customer", "agent", "admin"]))
+    current_user: User = Depends(require_app_role(APP_NAME, ["customer", "agent", "admin"]))
 ):
     policy = await Policy.get_or_none(id=claim.policy_id)
     if not policy:
@@ -79,12 +85,9 @@ async def create_claim(
     return ClaimResponse(**new_claim.__dict__)
 
 @router.get("/claims", response_model=List[ClaimResponse])
-async def get_claims(current_user: User = Depends(get_current_user)):
-    await ensure_customer_role(current_user)
-    
-    # Get user's app roles
-    app_roles = await AppRole.filter(user_id=current_user.id, app_name="insurance-claims")
-    user_roles = [ar.role for ar in app_roles]
+async def get_claims(principal: Principal = Depends(get_principal)):
+    user_roles = await ensure_customer_role(principal)
+    current_user = principal.user
     
     # Admin sees all
     if current_user.global_role == "admin":
@@ -109,15 +112,15 @@ async def get_claims(current_user: User = Depends(get_current_user)):
 @router.get("/claims/{claim_id}", response_model=ClaimResponse)
 async def get_claim(
     claim_id: int,
-    current_user: User = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
     claim = await Claim.get_or_none(id=claim_id)
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
     
     # Check access
-    app_roles = await AppRole.filter(user_id=current_user.id, app_name="insurance-claims")
-    user_roles = [ar.role for ar in app_roles]
+    current_user = principal.user
+    user_roles = principal.roles_for(APP_NAME)
     
     if current_user.global_role != "admin":
         if "customer" in user_roles and claim.customer_id != current_user.id:
@@ -131,15 +134,14 @@ async def get_claim(
 async def update_claim_status(
     claim_id: int,
     update: ClaimUpdate,
-    current_user: User = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
     claim = await Claim.get_or_none(id=claim_id)
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
     
-    # Get user's app roles
-    app_roles = await AppRole.filter(user_id=current_user.id, app_name="insurance-claims")
-    user_roles = [ar.role for ar in app_roles]
+    current_user = principal.user
+    user_roles = principal.roles_for(APP_NAME)
     
     # Validate status transition
     if update.status and update.status != claim.status:
@@ -162,10 +164,10 @@ async def update_claim_status(
 
 @router.get("/adjusters")
 async def get_adjusters(
-    current_user: User = Depends(require_app_role("insurance-claims", ["manager", "admin"]))
+    current_user: User = Depends(require_app_role(APP_NAME, ["manager", "admin"]))
 ):
     """Get list of users with adjuster role"""
-    adjuster_roles = await AppRole.filter(app_name="insurance-claims", role="adjuster")
+    adjuster_roles = await AppRole.filter(app_name=APP_NAME, role="adjuster")
     adjuster_ids = [ar.user_id for ar in adjuster_roles]
     adjusters = await User.filter(id__in=adjuster_ids, is_active=True)
     return [{"id": u.id, "name": u.username} for u in adjusters]
@@ -213,21 +215,29 @@ async def assign_role(
     if existing:
         return {"message": "Role already assigned"}
     
+    # Saving the AppRole bumps the user's role version, which invalidates
+    # their cached principal and any token carrying the old roles
     await AppRole.create(**assignment.dict())
     return {"message": "Role assigned successfully"}
 
 @router.post("/rewrite")
 async def rewrite_text(
     request: RewriteRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_user)
 ):
     """Rewrite text using AI for insurance claims"""
-    ai_service = AIService()
-    prompt = f"Rewrite this insurance claim text professionally and clearly. Keep it concise but detailed:\n\n{request.text}"
-    
-    response = await ai_service.generate_response(
-        prompt=prompt,
-        model_name=request.model
+    async def rewrite():
+        ai_service = AIService()
+        prompt = f"Rewrite this insurance claim text professionally and clearly. Keep it concise but detailed:\n\n{request.text}"
+        
+        response = await ai_service.generate_response(
+            prompt=prompt,
+            model_name=request.model
+        )
+        
+        return {"rewritten_text": response}
+    
+    return await idempotency_store.run(
+        "insurance-claims/rewrite", current_user.id, idempotency_key, rewrite, fingerprint(request)
     )
-    
-    return {"rewritten_text": response}
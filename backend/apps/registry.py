@@ -11,6 +11,7 @@ class AppConfig:
         router: APIRouter,
         models_module: str,
         init_function: Optional[Callable] = None,
+        shutdown_function: Optional[Callable] = None,
         display_name: str = "",
         description: str = "",
         icon: str = "🤖",
@@ -21,6 +22,7 @@ class AppConfig:
         self.router = router
         self.models_module = models_module
         self.init_function = init_function
+        self.shutdown_function = shutdown_function
         self.display_name = display_name or name.replace("-", " ").title()
         self.description = description
         self.icon = icon
@@ -47,5 +49,10 @@ class AppRegistry:
         for app in self._apps.values():
             if app.init_function:
                 await app.init_function()
+    
+    async def shutdown_apps(self):
+        for app in self._apps.values():
+            if app.shutdown_function:
+                await app.shutdown_function()
 
 registry = AppRegistry()
@@ -0,0 +1,90 @@
+"""
+Cache of verified bearer tokens -> authenticated user and the token's
+role claim (see auth.principal).
+
+Saves the jwt.decode and the User lookup that every authenticated
+request would otherwise repeat. Entries live for at most
+PRINCIPAL_CACHE_TTL_SECONDS and never beyond the token's own expiry.
+Any ORM save or delete of a User drops that user's entries, so
+deactivation or a role change takes effect on the next request; code
+that changes users with bulk .update() must call invalidate_user().
+Cached users are shared between requests and must be treated as read-only.
+"""
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+from tortoise.signals import post_delete, post_save
+from config import settings
+from auth.models import User
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (expires_at, user, token_roles)
+        self._tokens_by_user: Dict[int, Set[str]] = defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, token: str) -> Optional[Tuple[User, Any]]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user, token_roles = entry
+        if expires_at <= time.time():
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user, token_roles
+    
+    def put(self, token: str, user: User, token_exp: Optional[float] = None, token_roles: Any = None):
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        self._entries[token] = (expires_at, user, token_roles)
+        self._entries.move_to_end(token)
+        self._tokens_by_user[user.id].add(token)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+    
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry:
+            tokens = self._tokens_by_user.get(entry[1].id)
+            if tokens:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[1].id]
+    
+    def invalidate_user(self, user_id: int):
+        """Forget every cached token of a user (deactivation, role change)"""
+        for token in list(self._tokens_by_user.get(user_id, ())):
+            self._remove(token)
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "db_queries_saved": self.hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES
+)
+
+@post_save(User)
+async def _user_saved(sender, instance, created, using_db, update_fields):
+    principal_cache.invalidate_user(instance.id)
+
+@post_delete(User)
+async def _user_deleted(sender, instance, using_db):
+    principal_cache.invalidate_user(instance.id)
@@ -7,6 +7,7 @@ class User(BaseModel):
     hashed_password = fields.CharField(max_length=255)
     is_active = fields.BooleanField(default=True)
     global_role = fields.CharField(max_length=50, default="user")  # Platform-wide role: user, admin
+    role_version = fields.IntField(default=0)  # Bumped on every AppRole change, see auth.principal
     
     class Meta:
         table = "users"
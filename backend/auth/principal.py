@@ -0,0 +1,130 @@
+"""
+Request principal: the authenticated user plus all of their app roles.
+
+Roles are resolved once per request instead of one AppRole query per
+check. They come from the signed "roles" claim in the JWT when its "rv"
+(role version) still matches users.role_version. Otherwise they are
+loaded with a single query and kept in a small per-user cache keyed by
+that version. Any AppRole save or delete bumps the user's role version,
+so tokens and cache entries issued before a role change stop being
+trusted on the next request.
+"""
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from tortoise.expressions import F
+from tortoise.signals import post_delete, post_save
+from config import settings
+from auth.models import User
+from auth.cache import principal_cache
+from models.app_role import AppRole
+
+AppRoles = Dict[str, List[str]]
+
+class Principal:
+    __slots__ = ("user", "app_roles")
+
+    def __init__(self, user: User, app_roles: AppRoles):
+        self.user = user
+        self.app_roles = app_roles
+
+    @property
+    def is_admin(self) -> bool:
+        return self.user.global_role == "admin"
+
+    def roles_for(self, app_name: str) -> List[str]:
+        return list(self.app_roles.get(app_name, ()))
+
+    def has_any_role(self, app_name: str, roles: Iterable[str]) -> bool:
+        granted = self.app_roles.get(app_name, ())
+        return any(role in granted for role in roles)
+
+    def with_role(self, app_name: str, role: str):
+        """Record a role granted during this request without touching shared caches"""
+        self.app_roles = {**self.app_roles, app_name: self.roles_for(app_name) + [role]}
+
+class RoleCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[int, AppRoles]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, role_version: int) -> Optional[AppRoles]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] != role_version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user_id: int, role_version: int, app_roles: AppRoles):
+        self._entries[user_id] = (role_version, app_roles)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+role_cache = RoleCache(max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES)
+token_role_hits = 0
+
+async def load_app_roles(user: User) -> AppRoles:
+    """All app roles of a user in one query (or none, if cached at the current version)"""
+    cached = role_cache.get(user.id, user.role_version)
+    if cached is not None:
+        return cached
+
+    app_roles: AppRoles = defaultdict(list)
+    for app_name, role in await AppRole.filter(user_id=user.id).values_list("app_name", "role"):
+        app_roles[app_name].append(role)
+    app_roles = dict(app_roles)
+    role_cache.put(user.id, user.role_version, app_roles)
+    return app_roles
+
+def role_claims(user: User, app_roles: AppRoles) -> Dict:
+    """JWT claims carrying the user's roles, empty when disabled in settings"""
+    if not settings.JWT_ROLE_CLAIMS:
+        return {}
+    return {"roles": app_roles, "rv": user.role_version}
+
+def token_roles(payload: Dict) -> Optional[Tuple[int, AppRoles]]:
+    """(role_version, roles) from a decoded token, if it carries them"""
+    roles = payload.get("roles")
+    version = payload.get("rv")
+    if not isinstance(roles, dict) or not isinstance(version, int):
+        return None
+    return version, roles
+
+async def resolve_principal(user: User, claimed: Optional[Tuple[int, AppRoles]]) -> Principal:
+    global token_role_hits
+    if claimed is not None and claimed[0] == user.role_version:
+        token_role_hits += 1
+        return Principal(user, claimed[1])
+    return Principal(user, await load_app_roles(user))
+
+async def bump_role_version(user_id: int):
+    """Invalidate every token and cached principal that carries the user's old roles"""
+    await User.filter(id=user_id).update(role_version=F("role_version") + 1)
+    principal_cache.invalidate_user(user_id)
+    role_cache.invalidate(user_id)
+
+def stats() -> Dict:
+    return {"token_claim_hits": token_role_hits, "role_cache": role_cache.stats()}
+
+@post_save(AppRole)
+async def _app_role_saved(sender, instance, created, using_db, update_fields):
+    await bump_role_version(instance.user_id)
+
+@post_delete(AppRole)
+async def _app_role_deleted(sender, instance, using_db):
+    await bump_role_version(instance.user_id)
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel, EmailStr
 from auth.models import User
-from auth.utils import get_password_hash, verify_password, create_access_token, get_current_user
+from auth.utils import password_hasher, create_access_token, get_current_user
+from auth.principal import load_app_roles, role_claims
 
 router = APIRouter()
 
@@ -28,19 +29,28 @@ async def register(user_data: UserCreate):
     user = await User.create(
         email=user_data.email,
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password)
+        hashed_password=await password_hasher.hash(user_data.password)
     )
     
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data={"sub": user.id, **role_claims(user, {})})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
 async def login(user_data: UserLogin):
     user = await User.get_or_none(email=user_data.email)
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    access_token = create_access_token(data={"sub": user.id})
+    verified, new_hash = await password_hasher.verify_and_update(user_data.password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    # Transparently upgrade hashes made with an older cost setting
+    if new_hash:
+        user.hashed_password = new_hash
+        await user.save(update_fields=["hashed_password"])
+    
+    access_token = create_access_token(data={"sub": user.id, **role_claims(user, await load_app_roles(user))})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me")
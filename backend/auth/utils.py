@@ -1,13 +1,27 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from config import settings
 from auth.models import User
+from auth.cache import principal_cache
+from auth.principal import Principal, resolve_principal, token_roles
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max to the configured cost makes needs_update() flag any
+# hash made with a different cost, so it is rehashed on next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -15,6 +29,46 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool so hashing never blocks the event loop.
+
+    bcrypt releases the GIL, so workers hash in parallel with request
+    handling. At most `max_pending` requests wait for a worker; beyond
+    that callers get a 503 instead of piling up behind a login burst.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.capacity = workers + max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+        self.rejected = 0
+    
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent sign-ins, please retry",
+                headers={"Retry-After": "1"}
+            )
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+    
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also returns a fresh hash when the stored one uses outdated parameters"""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -24,18 +78,52 @@ def create_access_token(data: dict):
         to_encode["sub"] = str(to_encode["sub"])
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def authenticate(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Tuple[User, Optional[tuple]]:
+    """The single token check behind every auth dependency.
+
+    FastAPI caches a dependency's result per request, so however many
+    dependencies of a route build on this one, the token is decoded at
+    most once and the user loaded at most once per request (and neither
+    on a principal cache hit).
+    """
+    token = credentials.credentials
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
+    
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id_str: str = payload.get("sub")
         if user_id_str is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         user_id = int(user_id_str)
-    except (JWTError, ValueError) as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    except (JWTError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     
     user = await User.get_or_none(id=user_id)
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    
+    claimed = token_roles(payload)
+    principal_cache.put(token, user, payload.get("exp"), claimed)
+    return user, claimed
+
+async def get_current_user(authenticated: tuple = Depends(authenticate)) -> User:
+    """Dependency to get current authenticated user"""
+    return authenticated[0]
+
+async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[User]:
+    """Dependency for routes open to anonymous callers: the user when a valid token is sent, otherwise None"""
+    if credentials is None:
+        return None
+    try:
+        user, _ = await authenticate(credentials)
+    except HTTPException:
+        # A stale token shouldn't lock the caller out of an anonymous route
+        return None
     return user
+
+async def get_principal(authenticated: tuple = Depends(authenticate)) -> Principal:
+    """Dependency to get the current user with all app roles"""
+    user, claimed = authenticated
+    return await resolve_principal(user, claimed)
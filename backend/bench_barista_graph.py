@@ -0,0 +1,182 @@
+"""
+Benchmark per-message coordinator overhead for Agentic Barista
+Run: python bench_barista_graph.py
+
+Compares building a BaristaCoordinator (three agents + graph compile) for
+every message, as the /chat route used to, against reusing the shared
+compiled graph. The LLM is replaced by an instant reply so only the
+framework overhead is measured. Also reports how many messages of a
+typical mix the rule-based router settles without an LLM call, and
+checks that keyword look-alikes and negated requests in the mix are
+left to the LLM router. A streamed GENERAL turn is timed to its routing
+event and first chunk, which must not wait for the whole reply. Uses an
+in-memory SQLite database seeded with the standard menu.
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from tortoise import Tortoise
+from apps.agentic_barista.agents import coordinator as coordinator_module
+from apps.agentic_barista.agents.coordinator import BaristaCoordinator, barista_coordinator
+from apps.agentic_barista.cart import Cart
+from apps.agentic_barista.intent import classify_intent
+from apps.agentic_barista.menu_cache import menu_cache
+from apps.agentic_barista.models import MenuItem
+
+MESSAGES = 300
+
+MENU = [
+    ("Espresso", 2.50, "coffee"), ("Americano", 3.00, "coffee"), ("Latte", 4.50, "coffee"),
+    ("Cappuccino", 4.00, "coffee"), ("Mocha", 5.00, "coffee"), ("Croissant", 3.50, "pastry"),
+    ("Blueberry Muffin", 3.00, "pastry"), ("Chocolate Chip Cookie", 2.50, "pastry"),
+    ("Avocado Toast", 6.00, "food"), ("Bagel with Cream Cheese", 4.50, "food"),
+]
+
+# Messages that contain routing keywords but must not be fast-pathed
+MISLEADING_MESSAGES = [
+    "what a nice place", "complete waste of time lol", "thanks, that's all", "can you place an order for me",
+    "I had a latte yesterday, it was terrible", "do not add a latte",
+]
+
+# A typical session mix; the question, the vague request and the misleading messages need the LLM router
+ROUTING_MIX = [
+    "hi there", "show me the menu", "what pastries do you have?", "add 2 lattes and a croissant",
+    "can I get a bagel", "remove the croissant", "show my cart", "confirm order",
+    "does the mocha have dairy?", "what would you recommend on a cold day?", "I want to order",
+    *MISLEADING_MESSAGES,
+]
+
+SIMULATED_LLM_SECONDS = 0.05
+
+async def instant_model(model_name: str, prompt: str) -> str:
+    if "JSON object" in prompt:
+        return '{"intent": "GENERAL", "reply": "Hello there! ☕"}'
+    return "GENERAL" if "Classify into ONE" in prompt else "Hello there! ☕"
+
+async def per_message():
+    for i in range(MESSAGES):
+        coordinator = BaristaCoordinator(model_name="bench-model")
+        await coordinator.process_message("hello", f"bench-{i}", Cart(), "bench-model")
+
+async def shared():
+    for i in range(MESSAGES):
+        await barista_coordinator.process_message("hello", f"bench-{i}", Cart(), "bench-model")
+
+async def concurrent_models():
+    """Shared graph with interleaved models must not leak one request's model into another"""
+    seen = []
+
+    async def recording_model(model_name: str, prompt: str) -> str:
+        seen.append(model_name)
+        await asyncio.sleep(0)
+        return await instant_model(model_name, prompt)
+
+    coordinator_module.ai_service.call_model = recording_model
+    await asyncio.gather(*[
+        barista_coordinator.process_message("tell me something fun", f"c-{i}", Cart(), f"model-{i % 2}")
+        for i in range(20)
+    ])
+    coordinator_module.ai_service.call_model = instant_model
+    calls_per_message = 1 if coordinator_module.settings.BARISTA_COMBINED_ROUTING else 2
+    assert sorted(seen) == sorted([f"model-{i % 2}" for i in range(20)] * calls_per_message)
+
+async def measure(name, fn):
+    start = time.perf_counter()
+    await fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} total={elapsed * 1000:8.1f}ms  per message={elapsed / MESSAGES * 1000:6.2f}ms")
+
+async def routing():
+    menu = await menu_cache.get()
+    start = time.perf_counter()
+    decisions = [classify_intent(message, menu) for message in ROUTING_MIX * 100]
+    elapsed = time.perf_counter() - start
+    threshold = coordinator_module.settings.BARISTA_FAST_ROUTE_CONFIDENCE
+    fast = sum(1 for decision in decisions if decision.confidence >= threshold)
+    print(f"\nfast-path router: {fast / len(decisions):.0%} of a typical mix settled locally, "
+          f"{elapsed / len(decisions) * 1e6:.1f}µs per message (vs. one LLM round trip each)")
+    misrouted = [message for message in MISLEADING_MESSAGES if classify_intent(message, menu).confidence >= threshold]
+    assert not misrouted, f"fast-pathed misleading messages: {misrouted}"
+    print(f"  {len(MISLEADING_MESSAGES)} misleading messages all left to the LLM router")
+
+async def general_latency():
+    """Wall time of an LLM-routed GENERAL message with a fixed simulated model latency"""
+    async def slow_model(model_name: str, prompt: str) -> str:
+        await asyncio.sleep(SIMULATED_LLM_SECONDS)
+        return await instant_model(model_name, prompt)
+
+    coordinator_module.ai_service.call_model = slow_model
+    settings = coordinator_module.settings
+    original = settings.BARISTA_COMBINED_ROUTING
+    print(f"\ngeneral message with a {SIMULATED_LLM_SECONDS * 1000:.0f}ms model:")
+    try:
+        for combined in (False, True):
+            settings.BARISTA_COMBINED_ROUTING = combined
+            start = time.perf_counter()
+            await barista_coordinator.process_message("tell me something fun", "latency", Cart(), "bench-model")
+            label = "combined" if combined else "two calls"
+            print(f"  {label:<10} {(time.perf_counter() - start) * 1000:6.1f}ms")
+    finally:
+        settings.BARISTA_COMBINED_ROUTING = original
+        coordinator_module.ai_service.call_model = instant_model
+
+async def streamed_general():
+    """A streamed GENERAL turn routes with the short intent call and streams the reply, even with combined routing on"""
+    async def slow_model(model_name: str, prompt: str) -> str:
+        # A combined reply takes as long to generate as the whole answer
+        await asyncio.sleep(SIMULATED_LLM_SECONDS * (2 if "JSON object" in prompt else 1))
+        return await instant_model(model_name, prompt)
+
+    async def slow_stream(model_name: str, prompt: str, messages: list = None):
+        for word in "Hello there, happy to help! ☕".split():
+            await asyncio.sleep(SIMULATED_LLM_SECONDS / 5)
+            yield word + " "
+
+    ai_service = coordinator_module.ai_service
+    original_stream = ai_service.stream_model
+    ai_service.call_model = slow_model
+    ai_service.stream_model = slow_stream
+    try:
+        start = time.perf_counter()
+        routed_at = first_chunk_at = None
+        chunks = 0
+        async for event in barista_coordinator.stream_message("tell me something fun", "stream", Cart(), "bench-model"):
+            if "agent" in event:
+                routed_at = time.perf_counter() - start
+                assert event["agent"] == "general"
+            elif "chunk" in event:
+                chunks += 1
+                first_chunk_at = first_chunk_at or time.perf_counter() - start
+        assert chunks > 1, "general reply was not streamed"
+        assert routed_at < SIMULATED_LLM_SECONDS * 2, "routing waited for the combined reply"
+        print(f"  streamed   routed {routed_at * 1000:6.1f}ms, first chunk {first_chunk_at * 1000:6.1f}ms, {chunks} chunks")
+    finally:
+        ai_service.call_model = instant_model
+        ai_service.stream_model = original_stream
+
+async def main():
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["apps.agentic_barista.models"]})
+    await Tortoise.generate_schemas()
+    for name, price, category in MENU:
+        await MenuItem.create(name=name, description=name, price=price, category=category)
+
+    try:
+        coordinator_module.ai_service.call_model = instant_model
+        await concurrent_models()
+
+        print(f"📊 Barista coordinator overhead ({MESSAGES} messages, LLM excluded)\n")
+        await measure("per-message", per_message)
+        await measure("shared", shared)
+        await routing()
+        await general_latency()
+        await streamed_general()
+    finally:
+        await Tortoise.close_connections()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Benchmark barista order parsing on a large menu
+Run: python bench_barista_matcher.py
+
+Compares the original OrderAgent loop (substring test plus a freshly
+built re.search per menu item) against the word-level Aho-Corasick
+ItemMatcher, on a synthetic 500-item menu. No database is needed.
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from apps.agentic_barista.matcher import ItemMatcher
+from apps.agentic_barista.menu_cache import MenuEntry
+
+ITEMS = 500
+ROUNDS = 2000
+
+FLAVOURS = ["vanilla", "hazelnut", "caramel", "maple", "honey", "oat", "coconut", "almond", "ginger", "mint"]
+STYLES = ["latte", "mocha", "cold brew", "flat white", "cortado", "muffin", "scone", "cookie", "bagel", "toast"]
+SIZES = ["", "small ", "large ", "iced ", "double "]
+
+def build_menu():
+    names = []
+    for size in SIZES:
+        for flavour in FLAVOURS:
+            for style in STYLES:
+                names.append(f"{size}{flavour} {style}".title())
+    return [MenuEntry(i + 1, name, "", 4.0, "coffee", True) for i, name in enumerate(names[:ITEMS])]
+
+MESSAGES = [
+    "add 2 large maple lattes and a honey scone please",
+    "can I get three iced vanilla cold brews",
+    "hi there, what would you recommend for a rainy morning?",
+    "1 double ginger cortado and 2 almond cookies",
+]
+
+def legacy(menu, message):
+    """The original per-item loop from OrderAgent.process"""
+    found = []
+    for item in menu:
+        if item.name.lower() in message.lower():
+            quantity = 1
+            qty_match = re.search(r'(\d+)\s*' + re.escape(item.name.lower()), message.lower())
+            if qty_match:
+                quantity = int(qty_match.group(1))
+            found.append((quantity, item.name))
+    return found
+
+def measure(name, fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for message in MESSAGES:
+            fn(message)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} per message={elapsed / (ROUNDS * len(MESSAGES)) * 1e6:8.1f}µs")
+
+def main():
+    menu = build_menu()
+
+    start = time.perf_counter()
+    matcher = ItemMatcher(menu)
+    print(f"📊 Order parsing on a {len(menu)}-item menu (build {(time.perf_counter() - start) * 1000:.1f}ms)\n")
+
+    for message in MESSAGES:
+        found = [(m.quantity or 1, m.item.name) for m in matcher.find(message)]
+        print(f"  {message!r}\n    legacy:  {legacy(menu, message)}\n    matcher: {found}")
+    print()
+
+    assert [(m.quantity, m.item.name) for m in matcher.find(MESSAGES[0])] == [(2, "Large Maple Latte"), (1, "Honey Scone")]
+    assert [(m.quantity, m.item.name) for m in matcher.find(MESSAGES[1])] == [(3, "Iced Vanilla Cold Brew")]
+
+    measure("legacy", lambda message: legacy(menu, message))
+    measure("matcher", matcher.find)
+
+if __name__ == "__main__":
+    main()
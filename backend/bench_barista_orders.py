@@ -0,0 +1,128 @@
+"""
+Benchmark barista order history lookups on a large orders table
+Run: python bench_barista_orders.py [rows]   (default 1,000,000)
+
+Seeds barista_orders in a temporary SQLite file, then times the old
+/orders/{session_id} query (every order of the session, no index) against
+a keyset page served by the (session_id, created_at) index, and a user's
+history page with and without the (user_id, created_at) index. Production
+runs on Postgres; the indexes and queries are the same there, so the
+relative difference is what to look at, not the absolute timings.
+"""
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from tortoise import Tortoise
+from apps.agentic_barista.models import Order
+from services.pagination import keyset_page
+from init_db import model_index_sql
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+ORDERS_PER_SESSION = 5
+USERS = 2_000
+SIGNED_IN_SHARE = 0.6
+HEAVY_SESSION_ORDERS = 5_000  # a kiosk-style session that has been ordering for months
+LOOKUPS = 20
+PAGE_SIZE = 50
+SEED_BATCH = 20_000
+
+ITEMS = json.dumps([{"id": 3, "name": "Latte", "quantity": 2, "price": 4.5, "total": 9.0}])
+
+async def drop_history_indexes(conn):
+    """generate_schemas creates the Meta indexes; remove them to measure the old table"""
+    _, rows = await conn.execute_query(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'barista_orders' AND sql IS NOT NULL"
+    )
+    for row in rows:
+        if "reference" not in row["name"]:
+            await conn.execute_script(f"DROP INDEX {row['name']}")
+
+async def seed(conn):
+    random.seed(7)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    sessions = (ROWS - HEAVY_SESSION_ORDERS) // ORDERS_PER_SESSION
+    sql = (
+        "INSERT INTO barista_orders (created_at, updated_at, session_id, user_id, items, total, status, reference) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    batch = []
+    for i in range(ROWS):
+        created = (start + timedelta(seconds=i * 30)).isoformat()
+        if i % (ROWS // HEAVY_SESSION_ORDERS) == 0 and i // (ROWS // HEAVY_SESSION_ORDERS) < HEAVY_SESSION_ORDERS:
+            session_id = "kiosk"
+        else:
+            session_id = f"s{random.randrange(sessions)}"
+        user_id = random.randrange(1, USERS + 1) if random.random() < SIGNED_IN_SHARE else None
+        batch.append((created, created, session_id, user_id, ITEMS, 9.0, "confirmed", f"BR-{i:010X}"))
+        if len(batch) == SEED_BATCH:
+            await conn.execute_many(sql, batch)
+            batch = []
+    if batch:
+        await conn.execute_many(sql, batch)
+
+async def timed(fn, keys):
+    start = time.perf_counter()
+    for key in keys:
+        await fn(key)
+    return (time.perf_counter() - start) / len(keys) * 1000
+
+async def old_session_orders(session_id):
+    return await Order.filter(session_id=session_id).all()
+
+async def session_page(session_id):
+    return await keyset_page(Order.filter(session_id=session_id), None, PAGE_SIZE)
+
+async def user_page(user_id):
+    return await keyset_page(Order.filter(user_id=user_id), None, PAGE_SIZE)
+
+async def deep_user_page(user_id, pages=5):
+    cursor = None
+    for _ in range(pages):
+        _, cursor = await keyset_page(Order.filter(user_id=user_id), cursor, PAGE_SIZE)
+        if cursor is None:
+            break
+
+async def run(label, sessions, users):
+    print(f"\n{label}")
+    print(f"  session, all orders (old)  {await timed(old_session_orders, sessions):9.2f}ms")
+    print(f"  session, first page        {await timed(session_page, sessions):9.2f}ms")
+    print(f"  heavy session, all orders  {await timed(old_session_orders, ['kiosk'] * 3):9.2f}ms")
+    print(f"  heavy session, first page  {await timed(session_page, ['kiosk'] * 3):9.2f}ms")
+    print(f"  user, first page           {await timed(user_page, users):9.2f}ms")
+    print(f"  user, pages 1-5            {await timed(deep_user_page, users):9.2f}ms")
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        await Tortoise.init(db_url=f"sqlite://{tmp}/orders.db", modules={"models": ["apps.agentic_barista.models"]})
+        await Tortoise.generate_schemas()
+        conn = Tortoise.get_connection("default")
+        try:
+            await drop_history_indexes(conn)
+            start = time.perf_counter()
+            await seed(conn)
+            print(f"📊 Barista order history on {ROWS:,} orders (seeded in {time.perf_counter() - start:.1f}s, "
+                  f"avg ms per lookup over {LOOKUPS} lookups)")
+
+            random.seed(11)
+            sessions = [f"s{random.randrange((ROWS - HEAVY_SESSION_ORDERS) // ORDERS_PER_SESSION)}" for _ in range(LOOKUPS)]
+            users = [random.randrange(1, USERS + 1) for _ in range(LOOKUPS)]
+
+            await run("without indexes", sessions, users)
+            # The Meta indexes, as generate_schemas and init_db create them
+            for index_sql in model_index_sql(conn):
+                await conn.execute_script(index_sql)
+            await run("with (session_id, created_at) and (user_id, created_at) indexes", sessions, users)
+        finally:
+            await Tortoise.close_connections()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""
+Count database statements per AI Chat turn
+Run: python bench_chat_roundtrips.py
+
+Drives /chat/stream through the real app and counts every statement sent
+to the database client, per turn:
+- a new session;
+- a follow-up turn served from the context cache;
+- a follow-up turn after a cache miss;
+- a burst of concurrent turns, which share write-behind inserts.
+
+It runs on an in-memory SQLite database. The turn CTE and the multi-row
+insert are Postgres-only, so those two statements are answered by an
+in-memory stand-in; each still counts as one statement. The model is
+replaced by an instant reply. Before the turn CTE and write-behind queue,
+a follow-up turn took 5 statements (session check, user insert, context
+select, documents select, assistant insert).
+"""
+import asyncio
+import itertools
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://:memory:")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+from fastapi.testclient import TestClient
+from tortoise.backends.sqlite.client import SqliteClient
+import main
+from apps.ai_chat import queries, routes
+from apps.ai_chat.context_cache import conversation_cache
+
+CONCURRENT_TURNS = 20
+BASE = "/api/apps/ai-chat"
+
+statements = []
+messages = {}
+message_ids = itertools.count(1)
+
+def begin_turn_row(args):
+    session_id, user_id, content, context_limit, _, count_limit = args
+    history = messages.setdefault(session_id, [])
+    last_id = history[-1]["id"] if history else None
+    context = history[-context_limit:] if context_limit else []
+    unsummarized = min(len(history), count_limit)
+    history.append({"id": next(message_ids), "role": "user", "content": content})
+    return [{
+        "id": session_id, "summary": None, "summarized_until_id": 0,
+        "message_id": history[-1]["id"], "last_message_id": last_id,
+        "unsummarized_count": unsummarized, "context": context, "documents": []
+    }]
+
+def insert_rows(args):
+    rows = []
+    for session_id, role, content, _ in zip(*args):
+        message = {"id": next(message_ids), "role": role, "content": content}
+        messages.setdefault(session_id, []).append(message)
+        rows.append({"id": message["id"]})
+    return rows
+
+POSTGRES_ONLY = {queries.BEGIN_TURN_SQL: begin_turn_row, queries.INSERT_MESSAGES_SQL: insert_rows}
+
+def counting(name):
+    original = getattr(SqliteClient, name)
+
+    async def wrapper(self, query, values=None, *args, **kwargs):
+        statements.append(query)
+        if query in POSTGRES_ONLY:
+            return POSTGRES_ONLY[query](values)
+        return await original(self, query, values, *args, **kwargs) if values is not None else await original(self, query, *args, **kwargs)
+    return wrapper
+
+for method in ("execute_insert", "execute_many", "execute_query", "execute_query_dict"):
+    setattr(SqliteClient, method, counting(method))
+
+async def instant_model(*args, **kwargs):
+    yield "Hello! "
+    yield "Here is an answer."
+
+routes.stream_model = instant_model
+
+def settle():
+    """Let the write-behind queue flush"""
+    time.sleep(0.05)
+
+def measure(label, fn, turns=1):
+    settle()
+    before = len(statements)
+    fn()
+    settle()
+    count = len(statements) - before
+    print(f"  {label:<34} {count / turns:5.2f} statements per turn")
+
+def main_bench():
+    with TestClient(main.app) as client:
+        token = client.post("/api/auth/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "bench-password"
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def turn(session_id=None, text="hi"):
+            response = client.post(f"{BASE}/chat/stream", json={"message": text, "session_id": session_id}, headers=headers)
+            return int(response.text.split('"session_id": ')[1].split("}")[0])
+
+        # Warm up the principal cache so auth is not counted
+        session_id = turn()
+
+        print("📊 Database statements per chat turn (turn CTE + write-behind)\n")
+        measure("new session", lambda: turn())
+        measure("follow-up, context cached", lambda: turn(session_id))
+
+        def cache_miss():
+            conversation_cache.evict(session_id)
+            turn(session_id)
+        measure("follow-up, cache miss", cache_miss)
+
+        sessions = [turn() for _ in range(CONCURRENT_TURNS)]
+
+        async def burst():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as async_client:
+                await asyncio.gather(*[
+                    async_client.post(f"{BASE}/chat/stream", json={"message": "more", "session_id": sid}, headers=headers)
+                    for sid in sessions
+                ])
+        measure(f"{CONCURRENT_TURNS} concurrent follow-ups", lambda: client.portal.call(burst), turns=CONCURRENT_TURNS)
+        print(f"\n  write-behind: {routes.message_writer.stats()}")
+
+if __name__ == "__main__":
+    main_bench()
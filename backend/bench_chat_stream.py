@@ -0,0 +1,121 @@
+"""
+Benchmark SSE framing CPU cost for AI Chat streams
+Run: python bench_chat_stream.py
+
+Compares the original one-frame-per-chunk json.dumps loop with string
+concatenation against the coalescing writer, for a Groq-like stream of
+many tiny chunks. The provider section measures how those chunks reach
+the loop: a blocking SDK iterator driven one asyncio.to_thread hop per
+chunk, against AIService._stream_groq over the async client. No network
+or LLM calls are made.
+"""
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from apps.ai_chat.streaming import ChunkFrameEncoder, coalesce_chunks
+from services.ai_service import AIService
+
+TOKENS = 20000
+CHUNK = "tok "
+SESSION_ID = 12345
+
+async def provider(burst: int = 50):
+    """Tiny chunks arriving in bursts, yielding to the loop between bursts"""
+    for i in range(TOKENS):
+        yield CHUNK
+        if i % burst == 0:
+            await asyncio.sleep(0)
+
+async def baseline():
+    full_response = ""
+    frames = 0
+    async for chunk in provider():
+        full_response += chunk
+        frame = f"data: {json.dumps({'chunk': chunk, 'session_id': SESSION_ID})}\n\n"
+        frames += 1
+    return frames, len(full_response)
+
+async def coalesced(flush_interval: float = 0.03, max_bytes: int = 512):
+    encoder = ChunkFrameEncoder(SESSION_ID)
+    parts = []
+    frames = 0
+    async for chunk in coalesce_chunks(provider(), flush_interval, max_bytes):
+        parts.append(chunk)
+        frame = encoder.encode(chunk)
+        frames += 1
+    return frames, len("".join(parts))
+
+def sdk_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+class SyncCompletions:
+    """Groq SDK shape: create(stream=True) returns a blocking iterator"""
+    def create(self, **kwargs):
+        return (sdk_chunk(CHUNK) for _ in range(TOKENS))
+
+class AsyncStream:
+    def __init__(self):
+        self.remaining = TOKENS
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.remaining:
+            raise StopAsyncIteration
+        self.remaining -= 1
+        return sdk_chunk(CHUNK)
+
+class AsyncCompletions:
+    """AsyncGroq shape: awaited create(stream=True) returns an async iterator"""
+    async def create(self, **kwargs):
+        return AsyncStream()
+
+async def thread_hop():
+    # The previous iterate_in_thread: one worker-thread hop per chunk
+    client = SyncCompletions()
+    done = object()
+    iterator = iter(await asyncio.to_thread(lambda: client.create(model="groq/compound", messages=[], stream=True)))
+    parts = []
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, done)
+        if chunk is done:
+            break
+        if chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    return len(parts), len("".join(parts))
+
+async def async_client():
+    service = AIService.__new__(AIService)
+    service.groq_client = SimpleNamespace(chat=SimpleNamespace(completions=AsyncCompletions()))
+    parts = [chunk async for chunk in service._stream_groq("groq/compound", "", [])]
+    return len(parts), len("".join(parts))
+
+async def measure(name, fn):
+    start = time.process_time()
+    frames, length = await fn()
+    elapsed = time.process_time() - start
+    print(f"{name:<12} frames={frames:<6} chars={length:<7} cpu={elapsed * 1000:8.1f}ms  per token={elapsed / TOKENS * 1e6:6.2f}µs")
+
+async def main():
+    encoder = ChunkFrameEncoder(SESSION_ID)
+    sample = 'he said "hi" — ünïcode\n'
+    assert encoder.encode(sample) == f"data: {json.dumps({'chunk': sample, 'session_id': SESSION_ID})}\n\n"
+    
+    print(f"📊 SSE framing benchmark ({TOKENS} chunks)\n")
+    await measure("baseline", baseline)
+    await measure("coalesced", coalesced)
+
+    print(f"\n📊 Provider iteration benchmark ({TOKENS} chunks, cpu across all threads)\n")
+    await measure("thread hop", thread_hop)
+    await measure("async client", async_client)
+
+if __name__ == "__main__":
+    asyncio.run(main())
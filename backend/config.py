@@ -6,6 +6,33 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Password hashing: bcrypt cost and the dedicated hashing pool
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    
+    # Verified token -> user cache used by the auth dependencies
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Barista menu snapshot refresh interval (local edits refresh it immediately)
+    BARISTA_MENU_TTL_SECONDS: int = 60
+    # Barista cart store: "memory" (per worker, bounded LRU) or "database" (shared)
+    BARISTA_CART_STORE: str = "memory"
+    BARISTA_CART_IDLE_SECONDS: int = 3600
+    BARISTA_CART_MAX_SESSIONS: int = 10000
+    BARISTA_CART_MAX_BYTES: int = 16 * 1024 * 1024
+    # Messages the rule-based router scores at least this confident skip the LLM router
+    BARISTA_FAST_ROUTE_CONFIDENCE: float = 0.8
+    # One LLM call both routes and answers general chitchat (non-streamed turns; streamed turns stream the reply)
+    BARISTA_COMBINED_ROUTING: bool = True
+    # Confirmed barista orders are inserted in batches of up to this many rows, at most this many ms late
+    BARISTA_ORDER_BATCH_SIZE: int = 100
+    BARISTA_ORDER_FLUSH_MS: int = 5
+    
+    # Embed app roles in issued JWTs so role checks need no query
+    JWT_ROLE_CLAIMS: bool = True
+    
     GEMINI_API_KEY: str
     GEMINI_MODEL: str = "gemini-2.5-flash-lite"
     
@@ -19,6 +46,38 @@ class Settings(BaseSettings):
     
     S3_BUCKET_NAME: str = ""
     
+    # Per-process conversation context cache (ai_chat)
+    CHAT_CONTEXT_CACHE_SESSIONS: int = 1000
+    CHAT_CONTEXT_CACHE_MESSAGES: int = 100
+    CHAT_CONTEXT_CACHE_IDLE_SECONDS: int = 1800
+    
+    # Rolling conversation summary (ai_chat); 0 turns disables it
+    CHAT_SUMMARY_EVERY_TURNS: int = 5
+    CHAT_SUMMARY_RECENT_MESSAGES: int = 6
+    CHAT_SUMMARY_MODEL: str = "gemini-2.5-flash-lite"
+    # Messages folded per summarization call, and at most this many per background run
+    CHAT_SUMMARY_FOLD_CHUNK: int = 40
+    CHAT_SUMMARY_MAX_FOLD_PER_RUN: int = 200
+    
+    # Write-behind batching of assistant messages (ai_chat)
+    CHAT_WRITE_BATCH_SIZE: int = 50
+    CHAT_WRITE_FLUSH_MS: int = 5
+    
+    # SSE chunk coalescing for chat streams
+    SSE_FLUSH_INTERVAL_MS: int = 30
+    SSE_FLUSH_BYTES: int = 512
+    
+    # Resumable chat streams (Last-Event-ID replay)
+    SSE_RESUME_BUFFER_EVENTS: int = 2048
+    SSE_RESUME_GRACE_SECONDS: int = 60
+    
+    # Rows removed per statement when purging a deleted chat session
+    CHAT_DELETE_BATCH_SIZE: int = 1000
+    
+    # Idempotency-Key result store for LLM-invoking endpoints
+    IDEMPOTENCY_TTL_SECONDS: int = 300
+    IDEMPOTENCY_MAX_KEYS: int = 10000
+    
     class Config:
         env_file = ".env"
 
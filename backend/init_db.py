@@ -1,9 +1,19 @@
 import asyncio
 import re
+from typing import List
 from tortoise import Tortoise
+from tortoise.utils import get_schema_sql
 from config import settings
 from apps.agentic_barista.seed_menu import seed_menu
 
+def model_index_sql(conn) -> List[str]:
+    """CREATE INDEX IF NOT EXISTS statements for every model's Meta.indexes"""
+    return [
+        line.rstrip(";")
+        for line in get_schema_sql(conn, safe=True).splitlines()
+        if line.startswith("CREATE INDEX")
+    ]
+
 async def migrate():
     """Run database migrations"""
     conn = Tortoise.get_connection("default")
@@ -23,6 +33,55 @@ async def migrate():
         except:
             pass
     
+    # Columns added after the initial schema (role version, conversation summary, soft delete, order reference)
+    for column_sql in [
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS role_version INT NOT NULL DEFAULT 0",
+        "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summary TEXT",
+        "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summarized_until_id INT NOT NULL DEFAULT 0",
+        "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS is_deleted BOOLEAN NOT NULL DEFAULT FALSE",
+        "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ",
+        "ALTER TABLE barista_orders ADD COLUMN IF NOT EXISTS reference VARCHAR(32) UNIQUE",
+    ]:
+        try:
+            await conn.execute_query(column_sql)
+        except Exception as e:
+            print(f"⚠ Column migration skipped: {e}")
+    
+    # Composite indexes backing keyset pagination come from Meta.indexes. generate_schemas only
+    # builds them along with a new table, so create them here for tables that predate them
+    # (same names as generate_schemas, so this is a no-op once they exist)
+    for index_sql in model_index_sql(conn):
+        try:
+            await conn.execute_query(index_sql)
+        except Exception as e:
+            print(f"⚠ Index creation skipped: {e}")
+    
+    # Earlier versions also enforced reference uniqueness with a separate unique index. Where
+    # that index is the only one, it becomes the column's UNIQUE constraint (no rebuild); where
+    # the column already has its constraint, this fails and the drop below removes the copy
+    try:
+        await conn.execute_query(
+            "ALTER TABLE barista_orders ADD CONSTRAINT barista_orders_reference_key "
+            "UNIQUE USING INDEX idx_barista_orders_reference"
+        )
+    except:
+        pass
+    
+    # Explicitly named copies of Meta.indexes created by earlier versions of this script;
+    # every insert was maintaining both
+    for index_name in [
+        "idx_chat_messages_session_created",
+        "idx_chat_sessions_user_created",
+        "idx_chat_documents_session_created",
+        "idx_barista_orders_session_created",
+        "idx_barista_orders_user_created",
+        "idx_barista_orders_reference",
+    ]:
+        try:
+            await conn.execute_query(f"DROP INDEX IF EXISTS {index_name}")
+        except Exception as e:
+            print(f"⚠ Index drop skipped: {e}")
+    
     print("✅ Database migrations completed")
 
 async def seed_test_roles():
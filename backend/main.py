@@ -1,5 +1,6 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from tortoise import Tortoise
 from config import settings
@@ -13,6 +14,11 @@ import apps.agentic_lms
 import apps.agentic_tutor
 
 from apps.registry import registry
+from services.idempotency import IdempotencyKeyReused, idempotency_store
+from auth.cache import principal_cache
+from auth import principal
+from auth.models import User
+from middleware.auth import require_admin
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -81,6 +87,8 @@ async def lifespan(app: FastAPI):
     yield
     
     print("=== LIFESPAN SHUTDOWN ===")
+    await registry.shutdown_apps()
+    print("✓ Apps shut down")
     await Tortoise.close_connections()
     print("✓ Connections closed")
 
@@ -94,6 +102,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(IdempotencyKeyReused)
+async def idempotency_key_reused(request: Request, exc: IdempotencyKeyReused):
+    # Any endpoint honouring Idempotency-Key: same key, different body
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
 # Register auth router
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 
@@ -108,3 +121,13 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+@app.get("/metrics/idempotency")
+async def idempotency_metrics(current_user: User = Depends(require_admin)):
+    """Idempotency-Key hit rates per endpoint for this worker"""
+    return idempotency_store.stats()
+
+@app.get("/metrics/principal-cache")
+async def principal_cache_metrics(current_user: User = Depends(require_admin)):
+    """Authenticated-user cache occupancy and DB lookups saved for this worker"""
+    return {**principal_cache.stats(), "roles": principal.stats()}
@@ -19,6 +19,13 @@ class PaginatedResponse(BaseModel):
     page_size: int
     total_pages: int
 
+class CursorPaginatedResponse(BaseModel):
+    success: bool = True
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    has_more: bool
+    limit: int
+
 def success_response(data: Any, message: str = None) -> dict:
     return {"success": True, "data": data, "message": message}
 
@@ -34,3 +41,12 @@ def paginated_response(items: List[Any], total: int, page: int, page_size: int)
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size
     }
+
+def cursor_paginated_response(items: List[Any], next_cursor: Optional[str], limit: int) -> dict:
+    return {
+        "success": True,
+        "items": items,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+        "limit": limit
+    }
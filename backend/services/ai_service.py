@@ -1,6 +1,7 @@
 from typing import AsyncGenerator, Dict, List
+import asyncio
 import google.generativeai as genai
-from groq import Groq
+from groq import AsyncGroq
 import boto3
 import json
 from config import settings
@@ -26,7 +27,8 @@ DEFAULT_MODEL = "gemini-2.5-flash-lite"
 
 class AIService:
     def __init__(self):
-        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
+        # Async client: streamed chunks arrive on the event loop without a thread hop each
+        self.groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
         self.bedrock = boto3.client('bedrock-runtime', region_name=settings.AWS_REGION)
     
     def get_available_models(self) -> Dict[str, List[str]]:
@@ -57,7 +59,7 @@ class AIService:
             response = await model.generate_content_async(prompt)
             return response.text
         elif provider == "groq":
-            response = self.groq_client.chat.completions.create(
+            response = await self.groq_client.chat.completions.create(
                 model=model_name,
                 messages=[{"role": "user", "content": prompt}],
                 stream=False
@@ -102,18 +104,18 @@ class AIService:
     
     async def _call_gemini(self, model_name: str, prompt: str) -> str:
         model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         return response.text
     
     async def _stream_gemini(self, model_name: str, prompt: str) -> AsyncGenerator[str, None]:
         model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt, stream=True)
-        for chunk in response:
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
             if chunk.text:
                 yield chunk.text
     
     async def _call_groq(self, model_name: str, prompt: str) -> str:
-        response = self.groq_client.chat.completions.create(
+        response = await self.groq_client.chat.completions.create(
             model=model_name,
             messages=[{"role": "user", "content": prompt}]
         )
@@ -123,16 +125,19 @@ class AIService:
         if messages is None:
             messages = [{"role": "user", "content": prompt}]
         
-        response = self.groq_client.chat.completions.create(
+        stream = await self.groq_client.chat.completions.create(
             model=model_name,
             messages=messages,
             stream=True
         )
-        for chunk in response:
-            if chunk.choices[0].delta.content:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
     
     async def _call_bedrock(self, model_name: str, prompt: str) -> str:
+        return await asyncio.to_thread(self._invoke_bedrock, model_name, prompt)
+    
+    def _invoke_bedrock(self, model_name: str, prompt: str) -> str:
         body = json.dumps({
             "messages": [{"role": "user", "content": [{"text": prompt}]}],
             "inferenceConfig": {"max_new_tokens": 512}
@@ -0,0 +1,95 @@
+"""
+Idempotency-Key support for endpoints that invoke an LLM.
+
+A repeated request carrying the same key (per endpoint and caller)
+either waits for the generation already in flight or gets the stored
+result back, instead of spending tokens and writing rows again. Results
+are kept in process memory for IDEMPOTENCY_TTL_SECONDS, so retries must
+reach the same worker (as they do with sticky sessions or one replica).
+
+Each entry remembers a fingerprint of the request body. Reusing a key
+with a different body raises IdempotencyKeyReused (a 422 for the
+client) rather than returning an answer to another question.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from config import settings
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different body"""
+
+def fingerprint(payload: Any) -> str:
+    """Stable hash of a request body (a dict or pydantic model)"""
+    if hasattr(payload, "dict"):
+        payload = payload.dict()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: int, max_keys: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, future, body_hash)
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"requests": 0, "hits": 0, "joined": 0, "misses": 0, "conflicts": 0})
+    
+    def _evict(self):
+        now = time.monotonic()
+        while self._entries:
+            key, (expires_at, future, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_keys:
+                break
+            if not future.done() and expires_at > now:
+                # Never drop an in-flight generation; it ages out once finished
+                self._entries.move_to_end(key)
+                break
+            del self._entries[key]
+    
+    async def run(self, endpoint: str, scope: Any, key: Optional[str], compute: Callable[[], Awaitable[Any]], body_hash: str = "") -> Any:
+        """Return compute()'s result, computing it at most once per (endpoint, scope, key)"""
+        stats = self._stats[endpoint]
+        stats["requests"] += 1
+        if not key:
+            return await compute()
+        
+        entry_key = (endpoint, scope, key)
+        entry = self._entries.get(entry_key)
+        if entry and entry[0] > time.monotonic():
+            expires_at, future, stored_hash = entry
+            if stored_hash != body_hash:
+                stats["conflicts"] += 1
+                raise IdempotencyKeyReused(f"Idempotency-Key {key!r} was already used with a different request body")
+            stats["hits" if future.done() else "joined"] += 1
+            return await asyncio.shield(future)
+        
+        stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._entries[entry_key] = (time.monotonic() + self.ttl_seconds, future, body_hash)
+        self._evict()
+        try:
+            result = await compute()
+        except BaseException as e:
+            # Failed attempts are not remembered, so the client can retry
+            self._entries.pop(entry_key, None)
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody joined
+            raise
+        future.set_result(result)
+        return result
+    
+    def stats(self) -> Dict:
+        endpoints = {}
+        for endpoint, counts in self._stats.items():
+            keyed = counts["hits"] + counts["joined"] + counts["misses"] + counts["conflicts"]
+            endpoints[endpoint] = {
+                **counts,
+                "hit_rate": round((counts["hits"] + counts["joined"]) / keyed, 4) if keyed else 0.0
+            }
+        return {"keys": len(self._entries), "endpoints": endpoints}
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_keys=settings.IDEMPOTENCY_MAX_KEYS
+)
@@ -0,0 +1,41 @@
+"""
+Keyset (cursor) pagination over (created_at, id)
+"""
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+async def keyset_page(queryset: QuerySet, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """Fetch the next page of rows, newest first, strictly after the cursor position.
+
+    The queryset should be filtered on the leading column of a
+    (<filter>, created_at) index so the page is an index range scan.
+    """
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=id))
+    
+    rows = await queryset.order_by("-created_at", "-id").limit(limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return rows, next_cursor
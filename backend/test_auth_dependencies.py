@@ -0,0 +1,109 @@
+"""
+Auth dependency test: one token decode and at most one user load per request
+Run: python test_auth_dependencies.py   (or pytest test_auth_dependencies.py)
+
+Drives real routes through TestClient with jwt.decode and User.get_or_none
+wrapped in counters. Routes that combine require_app_role, get_principal
+and get_current_user used to decode the token once per dependency; they now
+share the request-cached auth.utils.authenticate. A warm principal cache
+skips both.
+"""
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+os.environ.setdefault("DATABASE_URL", "sqlite://:memory:")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import APIRouter, Depends
+from fastapi.testclient import TestClient
+import main
+from auth import utils
+from auth.cache import principal_cache
+from auth.models import User
+from auth.principal import Principal
+from middleware.auth import get_current_user, get_principal, require_app_role
+
+# Every auth dependency on one route: three decodes before they were unified
+probe = APIRouter()
+
+@probe.get("/combined")
+async def combined(
+    role_user: User = Depends(require_app_role("insurance-claims", ["customer"])),
+    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_principal)
+):
+    return {"same_user": role_user is current_user is principal.user}
+
+main.app.include_router(probe, prefix="/test-auth")
+
+POLICY = {
+    "vehicle_make": "Honda",
+    "vehicle_model": "Civic",
+    "vehicle_year": 2020,
+    "license_plate": "AUTH-1",
+    "coverage_amount": 10000
+}
+
+def counted(client, user_id, method, path, token, **kwargs):
+    """Send one request with a cold principal cache; returns (response, decodes, user loads)"""
+    principal_cache.invalidate_user(user_id)
+    with patch.object(utils.jwt, "decode", wraps=utils.jwt.decode) as decode, \
+         patch.object(User, "get_or_none", wraps=User.get_or_none) as get_user:
+        response = client.request(method, path, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+    return response, decode.call_count, get_user.call_count
+
+def register(client, name):
+    token = client.post("/api/auth/register", json={
+        "email": f"{name}@example.com", "username": name, "password": "auth-test-password"
+    }).json()["access_token"]
+    user_id = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"}).json()["id"]
+    return token, user_id
+
+def test_one_token_check_per_request():
+    print("🧪 Testing auth dependencies\n")
+    with TestClient(main.app) as client:
+        token, user_id = register(client, "authprobe")
+        # Grants the insurance customer role used by require_app_role below
+        client.get("/api/apps/insurance-claims/access", headers={"Authorization": f"Bearer {token}"})
+
+        routes = [
+            ("GET", "/test-auth/combined", {}),
+            ("GET", "/api/apps/insurance-claims/access", {}),
+            ("POST", "/api/apps/insurance-claims/policies", {"json": POLICY}),
+            ("GET", "/api/apps/insurance-claims/policies", {}),
+            ("GET", "/api/apps/ai-chat/sessions", {}),
+            ("GET", "/api/apps/agentic-barista/orders", {}),
+        ]
+        for method, path, kwargs in routes:
+            response, decodes, user_loads = counted(client, user_id, method, path, token, **kwargs)
+            print(f"{method} {path}: {response.status_code}, {decodes} decode(s), {user_loads} user load(s)")
+            assert response.status_code == 200, response.text
+            assert decodes == 1
+            assert user_loads <= 1
+
+        assert client.get("/test-auth/combined", headers={"Authorization": f"Bearer {token}"}).json()["same_user"]
+    print("\n✅ One decode and at most one user load per request")
+
+def test_cached_token_skips_decode():
+    with TestClient(main.app) as client:
+        token, user_id = register(client, "authcached")
+        headers = {"Authorization": f"Bearer {token}"}
+        # The role grant drops the cached principal; the next request caches it again
+        client.get("/api/apps/insurance-claims/access", headers=headers)
+        client.get("/test-auth/combined", headers=headers)
+
+        with patch.object(utils.jwt, "decode", wraps=utils.jwt.decode) as decode, \
+             patch.object(User, "get_or_none", wraps=User.get_or_none) as get_user:
+            response = client.get("/test-auth/combined", headers=headers)
+        assert response.status_code == 200, response.text
+        assert decode.call_count == 0
+        assert get_user.call_count == 0
+    print("✅ A cached token skips both")
+
+if __name__ == "__main__":
+    test_one_token_check_per_request()
+    test_cached_token_skips_decode()
@@ -10,13 +10,14 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from apps.agentic_barista.agents.coordinator import BaristaCoordinator
+from apps.agentic_barista.cart import Cart
 
 async def test_barista():
     print("🧪 Testing Agentic Barista\n")
     
     coordinator = BaristaCoordinator()
     session_id = "test_session"
-    cart = {}
+    cart = Cart()
     
     # Test 1: Show menu
     print("Test 1: Show menu")
@@ -30,7 +31,7 @@ async def test_barista():
     result = await coordinator.process_message("add 2 lattes and 1 croissant", session_id, cart)
     print(f"Agent: {result['agent']}")
     print(f"Response: {result['response']}")
-    print(f"Cart: {result['cart']}\n")
+    print(f"Cart: {result['cart'].quantities()}\n")
     cart = result['cart']
     
     # Test 3: Show cart
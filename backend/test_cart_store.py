@@ -0,0 +1,59 @@
+"""
+Cart store test: carts in use survive the idle purge
+Run: python test_cart_store.py   (or pytest test_cart_store.py)
+
+Uses an in-memory SQLite database. A cart created long ago but changed
+just now must keep its row when purge_idle runs; a cart idle for longer
+than the timeout is deleted.
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from tortoise import Tortoise
+from apps.agentic_barista.cart_store import DatabaseCartStore
+from apps.agentic_barista.models import BaristaCart, MenuItem
+from apps.agentic_barista.menu_cache import menu_cache
+
+IDLE_SECONDS = 3600
+
+async def check_recent_update_survives_purge():
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["apps.agentic_barista.models"]})
+    await Tortoise.generate_schemas()
+    try:
+        latte = await MenuItem.create(name="Latte", description="", price=4.5, category="coffee", available=True)
+        store = DatabaseCartStore(idle_seconds=IDLE_SECONDS)
+
+        for session_id in ("active", "idle"):
+            async with store.open(session_id) as cart:
+                cart.items.add((await menu_cache.get()).get(latte.id), 1)
+        # Both carts were created two hours ago
+        long_ago = datetime.now(timezone.utc) - timedelta(seconds=IDLE_SECONDS * 2)
+        await BaristaCart.all().update(updated_at=long_ago)
+
+        # The active cart changes now, through the versioned update path
+        async with store.open("active") as cart:
+            cart.items.add((await menu_cache.get()).get(latte.id), 1)
+        active = await BaristaCart.get(session_id="active")
+        assert active.version == 2
+        assert active.updated_at > long_ago
+
+        purged = await store.purge_idle()
+        remaining = await BaristaCart.all().values_list("session_id", flat=True)
+        print(f"purged {purged}, remaining {remaining}")
+        assert purged == 1
+        assert remaining == ["active"]
+        assert (await store.get("active")).quantity(latte.id) == 2
+    finally:
+        await Tortoise.close_connections()
+    print("✅ A recently updated cart survives the idle purge")
+
+def test_recent_update_survives_purge():
+    asyncio.run(check_recent_update_survives_purge())
+
+if __name__ == "__main__":
+    test_recent_update_survives_purge()
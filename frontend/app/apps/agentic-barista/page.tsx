@@ -55,35 +55,83 @@ export default function AgenticBarista() {
     setInputText('');
     setIsLoading(true);
 
+    const aiMessageId = (Date.now() + 1).toString();
+    const updateAiMessage = (patch: Partial<Message>) => {
+      setMessages(prev => {
+        if (!prev.some(m => m.id === aiMessageId)) {
+          return [...prev, { id: aiMessageId, text: '', isUser: false, timestamp: new Date(), ...patch }];
+        }
+        return prev.map(m => (m.id === aiMessageId ? { ...m, ...patch } : m));
+      });
+    };
+
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/apps/agentic-barista/chat`, {
+      // Streamed: the agent badge shows as soon as routing finishes, then the reply, then the cart
+      // Signed-in orders are linked to the user for their order history
+      const token = localStorage.getItem('token');
+      // One key per submit: a retry after a network failure replays the same turn instead of running it twice
+      const idempotencyKey = crypto.randomUUID();
+      const submit = () => fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/apps/agentic-barista/chat/stream`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
+          ...(token ? { Authorization: `Bearer ${token}` } : {})
+        },
         body: JSON.stringify({
           message: inputText,
           session_id: sessionId,
           model: selectedModel
         })
       });
+      const response = await submit().catch(submit);
 
-      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(`Server error: ${response.status}`);
+      }
 
-      const aiMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        text: data.response,
-        isUser: false,
-        timestamp: new Date(),
-        agent: data.agent,
-        reasoning: data.reasoning
-      };
+      const reader = response.body?.getReader();
+      const decoder = new TextDecoder();
+      let fullResponse = '';
+      let buffered = '';
+
+      if (reader) {
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
 
-      setMessages(prev => [...prev, aiMessage]);
-      setCart(data.cart || {});
-      setTotalAmount(data.total_amount || 0);
+          buffered += decoder.decode(value, { stream: true });
+          const frames = buffered.split('\n\n');
+          buffered = frames.pop() || '';
+
+          for (const frame of frames) {
+            if (!frame.startsWith('data: ')) continue;
+            const data = JSON.parse(frame.slice(6));
+            if (data.error) {
+              throw new Error(data.error);
+            }
+            if (data.warning) {
+              // An order confirmed earlier in this session could not be saved
+              setMessages(prev => [...prev, { id: `${aiMessageId}-warning`, text: `⚠️ ${data.warning}`, isUser: false, timestamp: new Date() }]);
+            }
+            if (data.agent && !data.done) {
+              updateAiMessage({ agent: data.agent, reasoning: data.reasoning });
+            }
+            if (data.chunk) {
+              fullResponse += data.chunk;
+              updateAiMessage({ text: fullResponse });
+            }
+            if (data.cart) {
+              setCart(data.cart);
+              setTotalAmount(data.total_amount || 0);
+            }
+          }
+        }
+      }
     } catch (error) {
       console.error('Error:', error);
       setMessages(prev => [...prev, {
-        id: (Date.now() + 1).toString(),
+        id: (Date.now() + 2).toString(),
         text: '❌ Sorry, something went wrong. Please try again.',
         isUser: false,
         timestamp: new Date()
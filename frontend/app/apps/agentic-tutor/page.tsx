@@ -76,11 +76,14 @@ export default function AgenticTutor() {
     setSending(true)
 
     try {
-      const res = await fetch(`${API_URL}/api/apps/agentic-tutor/chat`, {
+      // One key per submit: a retry after a network failure returns the first answer
+      const idempotencyKey = crypto.randomUUID()
+      const submit = () => fetch(`${API_URL}/api/apps/agentic-tutor/chat`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          Authorization: `Bearer ${localStorage.getItem('token')}`
+          Authorization: `Bearer ${localStorage.getItem('token')}`,
+          'Idempotency-Key': idempotencyKey
         },
         body: JSON.stringify({
           session_id: sessionId,
@@ -89,6 +92,7 @@ export default function AgenticTutor() {
           model: selectedModel
         })
       })
+      const res = await submit().catch(submit)
       const data = await res.json()
       
       setSessionId(data.session_id)
@@ -9,6 +9,9 @@ import jsPDF from 'jspdf'
 import AppHeader from '../../components/AppHeader'
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+const SESSION_PAGE_SIZE = 50
+const MESSAGE_PAGE_SIZE = 50
+const MAX_RESUME_ATTEMPTS = 3
 
 interface Message {
   role: string
@@ -47,7 +50,16 @@ export default function AIChat() {
   const [documents, setDocuments] = useState<Document[]>([])
   const [webSearchEnabled, setWebSearchEnabled] = useState(false)
   const [isUploading, setIsUploading] = useState(false)
+  // Keyset cursors for the next page of older sessions / messages (null when there are no more)
+  const [sessionsCursor, setSessionsCursor] = useState<string | null>(null)
+  const [messagesCursor, setMessagesCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const messagesEndRef = useRef<HTMLDivElement>(null)
+  const messagesContainerRef = useRef<HTMLDivElement>(null)
+  // Set while older messages are prepended, so the view keeps its place instead of jumping to the end
+  const preserveScrollRef = useRef<number | null>(null)
+  // Scroll events fire faster than state updates; this guards against fetching the same page twice
+  const loadingMoreRef = useRef(false)
   const recognitionRef = useRef<any>(null)
   const fileInputRef = useRef<HTMLInputElement>(null)
 
@@ -62,6 +74,12 @@ export default function AIChat() {
   }, [])
 
   useEffect(() => {
+    const container = messagesContainerRef.current
+    if (preserveScrollRef.current !== null && container) {
+      container.scrollTop = container.scrollHeight - preserveScrollRef.current
+      preserveScrollRef.current = null
+      return
+    }
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
   }, [messages])
 
@@ -80,12 +98,15 @@ export default function AIChat() {
     }
   }, [])
 
-  const loadSessions = async (authToken: string) => {
+  const loadSessions = async (authToken: string, cursor: string | null = null) => {
     try {
       const response = await axios.get(`${API_URL}/api/apps/ai-chat/sessions`, {
+        params: { limit: SESSION_PAGE_SIZE, ...(cursor ? { cursor } : {}) },
         headers: { Authorization: `Bearer ${authToken}` }
       })
-      setSessions(response.data)
+      // A cursor means "older sessions": append them; otherwise start over from the newest
+      setSessions(prev => cursor ? [...prev, ...response.data.items] : response.data.items)
+      setSessionsCursor(response.data.next_cursor)
     } catch (error: any) {
       console.error('Failed to load sessions:', error)
       // Don't show error to user on initial load - they might not have sessions yet
@@ -96,15 +117,55 @@ export default function AIChat() {
     }
   }
 
+  const loadMoreSessions = async () => {
+    if (!sessionsCursor || loadingMoreRef.current) return
+    loadingMoreRef.current = true
+    setIsLoadingMore(true)
+    await loadSessions(token, sessionsCursor)
+    loadingMoreRef.current = false
+    setIsLoadingMore(false)
+  }
+
+  const fetchMessagePage = async (id: number, cursor: string | null) => {
+    const response = await axios.get(`${API_URL}/api/apps/ai-chat/sessions/${id}/messages`, {
+      params: { limit: MESSAGE_PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+      headers: { Authorization: `Bearer ${token}` }
+    })
+    const page: Message[] = response.data.items.map((msg: any) => ({
+      ...msg,
+      timestamp: new Date(msg.created_at)
+    }))
+    return { page, nextCursor: response.data.next_cursor as string | null }
+  }
+
+  const loadOlderMessages = async () => {
+    if (!sessionId || !messagesCursor || loadingMoreRef.current) return
+    loadingMoreRef.current = true
+    setIsLoadingMore(true)
+    try {
+      const { page, nextCursor } = await fetchMessagePage(sessionId, messagesCursor)
+      const container = messagesContainerRef.current
+      preserveScrollRef.current = container ? container.scrollHeight - container.scrollTop : null
+      // Each page holds the messages just before the current oldest one, in chronological order
+      setMessages(prev => [...page, ...prev])
+      setMessagesCursor(nextCursor)
+    } catch (error) {
+      console.error('Failed to load older messages:', error)
+    } finally {
+      loadingMoreRef.current = false
+      setIsLoadingMore(false)
+    }
+  }
+
+  const handleMessagesScroll = (event: React.UIEvent<HTMLDivElement>) => {
+    if (event.currentTarget.scrollTop < 80) loadOlderMessages()
+  }
+
   const loadSession = async (id: number) => {
     try {
-      const response = await axios.get(`${API_URL}/api/apps/ai-chat/sessions/${id}/messages`, {
-        headers: { Authorization: `Bearer ${token}` }
-      })
-      setMessages(response.data.map((msg: any) => ({
-        ...msg,
-        timestamp: new Date(msg.created_at)
-      })))
+      const { page, nextCursor } = await fetchMessagePage(id, null)
+      setMessages(page)
+      setMessagesCursor(nextCursor)
       setSessionId(id)
       loadContextInfo(id)
       loadDocuments(id)
@@ -170,6 +231,7 @@ export default function AIChat() {
       if (sessionId === id) {
         setSessionId(null)
         setMessages([])
+        setMessagesCursor(null)
       }
     } catch (error) {
       console.error('Failed to delete session:', error)
@@ -198,11 +260,14 @@ export default function AIChat() {
     setStreamingMessage('')
 
     try {
-      const response = await fetch(`${API_URL}/api/apps/ai-chat/chat/stream`, {
+      // One key per submit: the retry below joins the same generation instead of calling the model again
+      const idempotencyKey = crypto.randomUUID()
+      const submit = () => fetch(`${API_URL}/api/apps/ai-chat/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
+          'Authorization': `Bearer ${token}`,
+          'Idempotency-Key': idempotencyKey
         },
         body: JSON.stringify({
           message: userInput,
@@ -212,6 +277,7 @@ export default function AIChat() {
           web_search: webSearchEnabled
         })
       })
+      const response = await submit().catch(submit)
 
       if (response.status === 401) {
         localStorage.removeItem('token')
@@ -224,43 +290,107 @@ export default function AIChat() {
         throw new Error(`Server error: ${response.status}`)
       }
 
-      const reader = response.body?.getReader()
-      const decoder = new TextDecoder()
       let fullResponse = ''
       let newSessionId = sessionId
+      let streamId = response.headers.get('X-Stream-Id')
+      let lastEventId = 0
+      let finished = false
+      let streamError = ''
+      let saved = false
 
-      if (reader) {
+      // Reads SSE frames until the stream ends; a dropped connection throws
+      const consume = async (res: Response) => {
+        const reader = res.body?.getReader()
+        if (!reader) return
+        const decoder = new TextDecoder()
+        let buffer = ''
         while (true) {
           const { done, value } = await reader.read()
           if (done) break
 
-          const chunk = decoder.decode(value)
-          const lines = chunk.split('\n')
-
-          for (const line of lines) {
-            if (line.startsWith('data: ')) {
-              const data = JSON.parse(line.slice(6))
-              if (data.chunk) {
-                fullResponse += data.chunk
-                setStreamingMessage(fullResponse)
-              }
-              if (data.session_id) {
-                newSessionId = data.session_id
-              }
-              if (data.done) {
-                setMessages(prev => [...prev, {
-                  role: 'assistant',
-                  content: fullResponse,
-                  timestamp: new Date()
-                }])
-                setStreamingMessage('')
-                setSessionId(newSessionId)
-                if (!sessionId) loadSessions(token)
-                if (newSessionId) loadContextInfo(newSessionId)
-              }
+          // Frames can be split across reads; keep the incomplete tail for the next one
+          buffer += decoder.decode(value, { stream: true })
+          const frames = buffer.split('\n\n')
+          buffer = frames.pop() || ''
+
+          for (const frame of frames) {
+            let payload = ''
+            for (const line of frame.split('\n')) {
+              if (line.startsWith('id: ')) lastEventId = parseInt(line.slice(4), 10)
+              else if (line.startsWith('data: ')) payload += line.slice(6)
+            }
+            if (!payload) continue
+
+            const data = JSON.parse(payload)
+            if (data.stream_id) {
+              streamId = data.stream_id
+            }
+            if (data.error && data.model) {
+              // Compare mode: one model failed, the others keep streaming
+              setMessages(prev => [...prev, { role: 'assistant', content: `⚠️ ${data.model}: ${data.error}`, timestamp: new Date() }])
+            } else if (data.error) {
+              streamError = data.error
+              finished = true
+            }
+            if (data.chunk) {
+              fullResponse += data.chunk
+              setStreamingMessage(fullResponse)
+            }
+            if (data.warning) {
+              // e.g. an earlier answer in this chat could not be saved
+              setMessages(prev => [...prev, { role: 'assistant', content: `⚠️ ${data.warning}`, timestamp: new Date() }])
             }
+            if (data.session_id) {
+              newSessionId = data.session_id
+            }
+            if (data.done) {
+              finished = true
+              saved = true
+              setMessages(prev => [...prev, {
+                role: 'assistant',
+                content: fullResponse,
+                timestamp: new Date()
+              }])
+              setStreamingMessage('')
+              setSessionId(newSessionId)
+              if (!sessionId) loadSessions(token)
+              if (newSessionId) loadContextInfo(newSessionId)
+            }
+          }
+        }
+      }
+
+      try {
+        await consume(response)
+      } catch (error) {
+        console.warn('Stream interrupted:', error)
+      }
+
+      // The generation keeps running server-side; pick it up from the last event received
+      for (let attempt = 1; !finished && streamId && attempt <= MAX_RESUME_ATTEMPTS; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 1000 * attempt))
+        try {
+          const resumed = await fetch(`${API_URL}/api/apps/ai-chat/chat/stream/${streamId}`, {
+            headers: { 'Authorization': `Bearer ${token}`, 'Last-Event-ID': String(lastEventId) }
+          })
+          if (!resumed.ok) {
+            // 404/410: the generation expired, its buffer overran, or this request reached another worker
+            const body = await resumed.json().catch(() => ({}))
+            streamError = body.detail || `Could not resume the answer (${resumed.status})`
+            break
           }
+          await consume(resumed)
+        } catch (error) {
+          console.warn(`Resume attempt ${attempt} failed:`, error)
+        }
+      }
+
+      if (streamError || !finished) {
+        if (fullResponse && !saved) {
+          // Keep what already arrived visible above the error
+          setMessages(prev => [...prev, { role: 'assistant', content: fullResponse, timestamp: new Date() }])
         }
+        throw new Error(streamError || 'The connection dropped before the answer finished')
       }
     } catch (error: any) {
       console.error('Chat error:', error)
@@ -353,7 +483,7 @@ export default function AIChat() {
         }}>
           <h2 style={{ marginBottom: '24px', fontSize: '20px', fontWeight: '600' }}>Chat History</h2>
           <button 
-            onClick={() => { setSessionId(null); setMessages([]) }}
+            onClick={() => { setSessionId(null); setMessages([]); setMessagesCursor(null) }}
             style={{ 
               width: '100%', 
               padding: '14px', 
@@ -407,6 +537,24 @@ export default function AIChat() {
               >×</button>
             </div>
           ))}
+          {sessionsCursor && (
+            <button
+              onClick={loadMoreSessions}
+              disabled={isLoadingMore}
+              style={{
+                width: '100%',
+                padding: '10px',
+                background: 'transparent',
+                border: '1px solid rgba(255, 255, 255, 0.1)',
+                borderRadius: '12px',
+                color: '#94a3b8',
+                cursor: isLoadingMore ? 'default' : 'pointer',
+                fontSize: '13px'
+              }}
+            >
+              {isLoadingMore ? 'Loading...' : 'Load older chats'}
+            </button>
+          )}
         </div>
       )}
 
@@ -640,7 +788,7 @@ export default function AIChat() {
         />
 
         {/* Messages */}
-        <div style={{ 
+        <div ref={messagesContainerRef} onScroll={handleMessagesScroll} style={{ 
           flex: 1, 
           overflowY: 'auto', 
           background: 'rgba(30, 41, 59, 0.4)',
@@ -651,6 +799,25 @@ export default function AIChat() {
           border: '1px solid rgba(255, 255, 255, 0.1)',
           boxShadow: 'inset 0 2px 12px rgba(0, 0, 0, 0.2)'
         }}>
+          {messagesCursor && (
+            <div style={{ textAlign: 'center', marginBottom: '20px' }}>
+              <button
+                onClick={loadOlderMessages}
+                disabled={isLoadingMore}
+                style={{
+                  padding: '8px 16px',
+                  background: 'rgba(15, 23, 42, 0.6)',
+                  border: '1px solid rgba(255, 255, 255, 0.1)',
+                  borderRadius: '10px',
+                  color: '#94a3b8',
+                  cursor: isLoadingMore ? 'default' : 'pointer',
+                  fontSize: '13px'
+                }}
+              >
+                {isLoadingMore ? 'Loading...' : 'Load earlier messages'}
+              </button>
+            </div>
+          )}
           {filteredMessages.map((msg, idx) => (
             <div key={idx} style={{ 
               marginBottom: '28px', 
@@ -50,11 +50,17 @@ export default function NewClaim() {
 
     try {
       const token = localStorage.getItem('token')
-      const res = await axios.post(`${API_URL}/api/apps/insurance-claims/rewrite`, {
+      // One key per submit: a retry after a network failure returns the first rewrite
+      const idempotencyKey = crypto.randomUUID()
+      const submit = () => axios.post(`${API_URL}/api/apps/insurance-claims/rewrite`, {
         text,
         model: selectedModel
       }, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}`, 'Idempotency-Key': idempotencyKey }
+      })
+      const res = await submit().catch(error => {
+        if (error.response) throw error
+        return submit()
       })
       setRewriteModal(prev => ({ ...prev, rewritten: res.data.rewritten_text, loading: false }))
     } catch (error) {
@@ -1,7 +1,11 @@
+import dis
 import json
+import os
 import sys
 import io
+import hashlib as _hashlib
 import traceback
+from collections import OrderedDict
 from contextlib import redirect_stdout, redirect_stderr
 
 # Import safe modules
@@ -21,116 +25,304 @@ import hashlib
 import base64
 import textwrap
 
-def lambda_handler(event, context):
-    """Execute Python code safely and return output"""
-    
-    code = event.get('code', '')
-    timeout = event.get('timeout', 30)
-    
-    if not code:
-        return {
-            'statusCode': 400,
-            'body': json.dumps({'error': 'No code provided'})
-        }
-    
-    # Capture stdout and stderr
+ALLOWED_MODULES = {
+    'math', 'json', 'datetime', 'random', 'statistics',
+    're', 'collections', 'itertools', 'string', 'decimal',
+    'fractions', 'uuid', 'hashlib', 'base64', 'textwrap'
+}
+
+# Modules whose functions always give the same output for the same input;
+# random, uuid and datetime are deliberately left out
+DETERMINISTIC_MODULES = {
+    'math', 'json', 'statistics', 're', 'collections', 'itertools', 'string',
+    'decimal', 'fractions', 'hashlib', 'base64', 'textwrap'
+}
+
+# Attributes that lead out of a deterministic module into a random source
+NONDETERMINISTIC_ATTRIBUTES = {'random', 'uuid', 'datetime', 'time', 'sys', 'os', 'samples', 'urandom'}
+
+# The decimal context is shared state: its precision and rounding change
+# what every later Decimal operation prints
+DECIMAL_CONTEXT_NAMES = {'getcontext', 'setcontext', 'localcontext', 'DefaultContext'}
+
+# Default reprs such as <function f at 0x7f...> embed a memory address
+MEMORY_ADDRESS = re.compile(r'\bat 0x[0-9a-fA-F]+')
+
+NAME_LOADS = {'LOAD_NAME', 'LOAD_GLOBAL', 'LOAD_FROM_DICT_OR_GLOBALS'}
+NAME_STORES = {'STORE_NAME', 'STORE_GLOBAL'}
+ATTRIBUTE_OPS = {'LOAD_ATTR', 'LOAD_METHOD', 'STORE_ATTR', 'DELETE_ATTR', 'IMPORT_FROM', 'LOAD_SUPER_ATTR'}
+# Writing an attribute may change a shared module or object ("math.pi = 3")
+ATTRIBUTE_WRITES = {'STORE_ATTR', 'DELETE_ATTR'}
+
+CODE_CACHE_SIZE = int(os.environ.get('CODE_CACHE_SIZE', '256'))
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '256'))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '20'))
+
+
+class LRUCache:
+    """Small LRU cache kept warm across invocations of the same container"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key):
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+code_cache = LRUCache(CODE_CACHE_SIZE)
+result_cache = LRUCache(RESULT_CACHE_SIZE)
+
+
+def safe_import(name, *args, **kwargs):
+    """Custom __import__ that only allows whitelisted modules"""
+    if name in ALLOWED_MODULES:
+        return __import__(name, *args, **kwargs)
+    raise ImportError(f"Module '{name}' is not allowed")
+
+
+SAFE_BUILTINS = {
+    '__import__': safe_import,
+    'print': print,
+    'len': len,
+    'range': range,
+    'str': str,
+    'int': int,
+    'float': float,
+    'list': list,
+    'dict': dict,
+    'set': set,
+    'tuple': tuple,
+    'sum': sum,
+    'max': max,
+    'min': min,
+    'abs': abs,
+    'round': round,
+    'sorted': sorted,
+    'enumerate': enumerate,
+    'zip': zip,
+    'map': map,
+    'filter': filter,
+    'any': any,
+    'all': all,
+    'bool': bool,
+    'bytes': bytes,
+    'chr': chr,
+    'ord': ord,
+    'hex': hex,
+    'oct': oct,
+    'bin': bin,
+    'pow': pow,
+    'divmod': divmod,
+    'isinstance': isinstance,
+    'issubclass': issubclass,
+    'type': type,
+}
+
+# '__import__' is left out: dynamic imports can't be checked ahead of time
+DETERMINISTIC_BUILTINS = set(SAFE_BUILTINS) - {'__import__'}
+
+
+# Snippets share the module objects, so every snippet starts from the
+# decimal context and module namespaces the container started with
+PRISTINE_DECIMAL_CONTEXT = decimal.getcontext().copy()
+SHARED_MODULES = [math, json_module, datetime, random, statistics, re, collections, itertools,
+                  string, decimal, fractions, uuid, hashlib, base64, textwrap]
+MODULE_SNAPSHOTS = [(module.__dict__, dict(module.__dict__)) for module in SHARED_MODULES]
+
+
+def restore_modules():
+    """Undo whatever a snippet assigned to or deleted from a shared module"""
+    for namespace, snapshot in MODULE_SNAPSHOTS:
+        for name in [name for name in namespace if name not in snapshot]:
+            del namespace[name]
+        for name, value in snapshot.items():
+            if namespace.get(name, snapshot) is not value:
+                namespace[name] = value
+
+
+def build_globals():
+    """Fresh restricted globals so snippets never share state"""
+    return {
+        '__builtins__': dict(SAFE_BUILTINS),
+        # Pre-imported safe modules (can be used directly without import)
+        'math': math,
+        'json': json_module,
+        'datetime': datetime,
+        'random': random,
+        'statistics': statistics,
+        're': re,
+        'collections': collections,
+        'itertools': itertools,
+        'string': string,
+        'decimal': decimal,
+        'fractions': fractions,
+        'uuid': uuid,
+        'hashlib': hashlib,
+        'base64': base64,
+        'textwrap': textwrap,
+    }
+
+
+def code_key(code):
+    return _hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def compile_cached(code, key):
+    """Return the compiled code object for a snippet, compiling at most once"""
+    compiled = code_cache.get(key)
+    if compiled is None:
+        compiled = compile(code, '<snippet>', 'exec')
+        code_cache.put(key, compiled)
+    return compiled
+
+
+def is_deterministic(compiled):
+    """True when the snippet, including nested functions and classes, can only
+    reach allowlisted builtins and deterministic modules.
+
+    Works on the bytecode: every global name read must be assigned by the
+    snippet itself or be allowlisted, every import must be a deterministic
+    module, and attribute access may not use dunders (the way out to
+    __import__, __builtins__ and friends) or names that lead to a random
+    source. Attribute writes and the decimal context functions are shared
+    state, so they also rule caching out. Anything the check can't prove
+    is treated as nondeterministic.
+    """
+    code_objects = []
+    stack = [compiled]
+    while stack:
+        current = stack.pop()
+        code_objects.append(current)
+        stack.extend(c for c in current.co_consts if hasattr(c, 'co_code'))
+
+    instructions = [i for code_object in code_objects for i in dis.get_instructions(code_object)]
+    assigned = {i.argval for i in instructions if i.opname in NAME_STORES}
+    # Class bodies read __name__ to set __module__
+    allowed_names = assigned | DETERMINISTIC_BUILTINS | DETERMINISTIC_MODULES | {'__name__'}
+
+    for instruction in instructions:
+        name = instruction.argval
+        if instruction.opname in NAME_LOADS and name not in allowed_names:
+            return False
+        if instruction.opname in ATTRIBUTE_WRITES or (isinstance(name, str) and name in DECIMAL_CONTEXT_NAMES):
+            return False
+        if instruction.opname == 'IMPORT_NAME' and name.split('.')[0] not in DETERMINISTIC_MODULES:
+            return False
+        if instruction.opname in ATTRIBUTE_OPS and (name.startswith('__') or name in NONDETERMINISTIC_ATTRIBUTES):
+            return False
+    return True
+
+
+def invalid_snippet(message):
+    return {'output': '', 'errors': message, 'success': False}
+
+
+def execute_snippet(code):
+    """Execute one snippet in isolation and return its result dict"""
     stdout_capture = io.StringIO()
     stderr_capture = io.StringIO()
-    
+    key = code_key(code)
+
+    cached = result_cache.get(key)
+    if cached is not None:
+        return dict(cached, cached=True)
+
     try:
-        # Create restricted globals with safe modules
-        # Custom __import__ that only allows whitelisted modules
-        allowed_modules = {
-            'math', 'json', 'datetime', 'random', 'statistics',
-            're', 'collections', 'itertools', 'string', 'decimal',
-            'fractions', 'uuid', 'hashlib', 'base64', 'textwrap'
-        }
-        
-        def safe_import(name, *args, **kwargs):
-            if name in allowed_modules:
-                return __import__(name, *args, **kwargs)
-            raise ImportError(f"Module '{name}' is not allowed")
-        
-        safe_globals = {
-            '__builtins__': {
-                '__import__': safe_import,  # Custom import function
-                'print': print,
-                'len': len,
-                'range': range,
-                'str': str,
-                'int': int,
-                'float': float,
-                'list': list,
-                'dict': dict,
-                'set': set,
-                'tuple': tuple,
-                'sum': sum,
-                'max': max,
-                'min': min,
-                'abs': abs,
-                'round': round,
-                'sorted': sorted,
-                'enumerate': enumerate,
-                'zip': zip,
-                'map': map,
-                'filter': filter,
-                'any': any,
-                'all': all,
-                'bool': bool,
-                'bytes': bytes,
-                'chr': chr,
-                'ord': ord,
-                'hex': hex,
-                'oct': oct,
-                'bin': bin,
-                'pow': pow,
-                'divmod': divmod,
-                'isinstance': isinstance,
-                'issubclass': issubclass,
-                'type': type,
-            },
-            # Pre-imported safe modules (can be used directly without import)
-            'math': math,
-            'json': json_module,
-            'datetime': datetime,
-            'random': random,
-            'statistics': statistics,
-            're': re,
-            'collections': collections,
-            'itertools': itertools,
-            'string': string,
-            'decimal': decimal,
-            'fractions': fractions,
-            'uuid': uuid,
-            'hashlib': hashlib,
-            'base64': base64,
-            'textwrap': textwrap,
-        }
-        
-        # Execute code with captured output
-        with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-            exec(code, safe_globals)
-        
-        output = stdout_capture.getvalue()
+        compiled = compile_cached(code, key)
+        deterministic = is_deterministic(compiled)
+
+        # Execute code with captured output; the decimal context is a fresh copy per snippet
+        try:
+            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture), \
+                    decimal.localcontext(PRISTINE_DECIMAL_CONTEXT):
+                exec(compiled, build_globals())
+        finally:
+            # Changing a module takes an attribute write or a dunder, which the check rejects
+            if not deterministic:
+                restore_modules()
+
         errors = stderr_capture.getvalue()
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'output': output,
-                'errors': errors if errors else None,
-                'success': True
-            })
+        result = {
+            'output': stdout_capture.getvalue(),
+            'errors': errors if errors else None,
+            'success': True
         }
-        
+        if deterministic and not MEMORY_ADDRESS.search(result['output'] + (errors or '')):
+            result_cache.put(key, result)
+        return result
+
     except Exception as e:
         error_msg = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
-        
+        return {
+            'output': stdout_capture.getvalue(),
+            'errors': error_msg,
+            'success': False
+        }
+
+
+def lambda_handler(event, context):
+    """Execute Python code safely and return output
+
+    Accepts either a single ``code`` string or a ``snippets`` list, which is
+    executed in order with each snippet isolated from the others.
+    """
+
+    code = event.get('code', '')
+    snippets = event.get('snippets')
+    timeout = event.get('timeout', 30)
+
+    if snippets is not None:
+        if not isinstance(snippets, list) or not snippets:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'No snippets provided'})
+            }
+        if len(snippets) > MAX_BATCH_SIZE:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'At most {MAX_BATCH_SIZE} snippets per batch'})
+            }
+
+        # A malformed entry fails on its own instead of failing the batch
+        results = [
+            execute_snippet(snippet) if isinstance(snippet, str) else invalid_snippet('Snippet must be a string')
+            for snippet in snippets
+        ]
         return {
             'statusCode': 200,
             'body': json.dumps({
-                'output': stdout_capture.getvalue(),
-                'errors': error_msg,
-                'success': False
+                'results': results,
+                'success': all(r['success'] for r in results)
             })
         }
+
+    if not code:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'No code provided'})
+        }
+    if not isinstance(code, str):
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Code must be a string'})
+        }
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(execute_snippet(code))
+    }